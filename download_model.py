@@ -1,44 +1,394 @@
 """
 下载 YOLOv8n ONNX 模型
 """
-import urllib.request
+import hashlib
+import json
 import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import urljoin
 
+import urllib3
+
+# 下载地址 (Hugging Face；后两个带commit hash，内容固定)
+# 下载内容用 Hugging Face 在重定向响应中返回的 X-Linked-Etag (LFS 文件内容的 sha256) 校验，
+# 只能保证传输完整，不能保证下载源本身提供的是哪个模型
 MODEL_URLS = [
-    # Hugging Face (带commit hash更稳定)
     "https://huggingface.co/Kalray/yolov8/resolve/main/yolov8n.onnx",
     "https://huggingface.co/SpotLab/YOLOv8Detection/resolve/3005c6751fb19cdeb6b10c066185908faf66a097/yolov8n.onnx",
     "https://huggingface.co/unity/inference-engine-yolo/resolve/ed7f4daf9263d0d31be1d60b9d67c8baea721d60/yolov8n.onnx",
 ]
 
+CHUNK_SIZE = 1 << 20  # 每次读写 1 MiB
+MAX_REDIRECTS = 5
+
+HF_HOST = "huggingface.co"
+_RETRIES = urllib3.Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+
+# 下载源都在 huggingface.co 上，直接用该主机的专用连接池，
+# HEAD、GET 以及切换下载源时都复用同一条 TLS 连接
+_HF_POOL = urllib3.HTTPSConnectionPool(HF_HOST, maxsize=2, block=True, retries=_RETRIES)
+# 其他主机 (如重定向后的 CDN) 使用通用连接池
+_POOL = urllib3.PoolManager(maxsize=4, retries=_RETRIES)
+
+
+def _open(url, headers, method="GET"):
+    """
+    发起请求并手动跟随重定向
+
+    Returns:
+        (response, 服务器声明的sha256或None)
+    """
+    linked_sha256 = None
+    timeout = urllib3.Timeout(connect=5, read=30)
+    for _ in range(MAX_REDIRECTS + 1):
+        # 每一跳只解析一次URL，直接把路径交给对应主机的连接池
+        parts = urllib3.util.parse_url(url)
+        if parts.scheme == "https" and parts.host == HF_HOST and parts.port in (None, 443):
+            pool = _HF_POOL
+        else:
+            pool = _POOL.connection_from_host(parts.host, parts.port, parts.scheme)
+        resp = pool.urlopen(method, parts.request_uri, headers=headers,
+                            preload_content=False, redirect=False, timeout=timeout)
+        etag = resp.headers.get("X-Linked-Etag")
+        if etag:
+            linked_sha256 = etag.strip('"').lower()
+        location = resp.get_redirect_location()
+        if not location:
+            return resp, linked_sha256
+        resp.drain_conn()
+        resp.release_conn()
+        url = urljoin(url, location)
+    raise IOError("重定向次数过多")
+
+
+def _hash_file(path):
+    """计算文件的sha256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _looks_like_onnx(path):
+    """
+    检查文件是否为有效的ONNX模型 (防止把HTML错误页当成模型)
+
+    安装了 onnx 时使用 onnx.checker，否则只检查文件头:
+    ONNX 是 protobuf，首个字段为 ir_version (tag 0x08 + varint)
+    """
+    try:
+        import onnx
+    except ImportError:
+        with open(path, "rb") as f:
+            head = f.read(16)
+        if len(head) < 2 or head[0] != 0x08:
+            return False
+        ir_version = 0
+        for shift, byte in enumerate(head[1:6]):
+            ir_version |= (byte & 0x7F) << (7 * shift)
+            if not byte & 0x80:
+                return 1 <= ir_version <= 100
+        return False
+
+    try:
+        onnx.checker.check_model(onnx.load(str(path), load_external_data=False))
+        return True
+    except Exception:
+        return False
+
+
+def _remote_info(resp, linked_sha256):
+    """从响应头提取 (文件大小, ETag)，大小未知时为 -1"""
+    size = resp.headers.get("X-Linked-Size") or resp.headers.get("Content-Length")
+    etag = linked_sha256 or resp.headers.get("ETag")
+    return int(size) if size else -1, etag
+
+
+def _load_meta(save_path):
+    """读取模型元数据 {url, size, etag, sha256, mtime_ns}"""
+    meta_path = save_path.with_name(save_path.name + ".meta.json")
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(save_path, **meta):
+    meta["size"] = save_path.stat().st_size
+    meta["mtime_ns"] = save_path.stat().st_mtime_ns
+    meta_path = save_path.with_name(save_path.name + ".meta.json")
+    tmp_path = meta_path.with_name(meta_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp_path, meta_path)
+
+
+def _verify_existing(save_path, meta):
+    """校验已存在的模型文件，mtime未变化时认为与上次校验时相同，不再重新读取"""
+    if meta.get("sha256") and meta.get("mtime_ns") == save_path.stat().st_mtime_ns:
+        return True
+    if not _looks_like_onnx(save_path):
+        return False
+    _save_meta(save_path, url=meta.get("url"), etag=meta.get("etag"), sha256=_hash_file(save_path))
+    return True
+
+
+def _is_up_to_date(meta):
+    """用一次HEAD请求比较远程文件的 Content-Length 和 ETag"""
+    url = meta.get("url")
+    if not url:
+        # 手动放入的模型，没有可比较的来源
+        return True
+    try:
+        resp, linked_sha256 = _open(url, {}, method="HEAD")
+        resp.release_conn()
+    except Exception as e:
+        print(f"无法检查模型更新: {e}")
+        return True
+    if resp.status != 200:
+        return True
+
+    size, etag = _remote_info(resp, linked_sha256)
+    if etag and meta.get("etag") and etag != meta["etag"]:
+        return False
+    return size < 0 or size == meta.get("size")
+
+
+def _race(mirrors, headers_for):
+    """
+    同时请求所有下载源，采用最先返回有效响应的那个
+
+    headers_for(url) 返回该下载源的请求头 (只有 .part 来源的下载源带 Range)
+
+    Returns:
+        (winner, failed): winner 为 (url, 服务器声明的sha256, ETag, response) 或 None，
+        failed 为请求失败的下载地址列表
+    """
+    won = threading.Event()
+    lock = threading.Lock()
+    winner = []
+    failed = []
+
+    def attempt(url):
+        try:
+            resp, linked_sha256 = _open(url, headers_for(url))
+        except Exception as e:
+            print(f"失败: {url}\n  {e}")
+            failed.append(url)
+            return
+        with lock:
+            if not won.is_set() and resp.status in (200, 206, 416):
+                won.set()
+                _, etag = _remote_info(resp, linked_sha256)
+                winner.append((url, linked_sha256, etag, resp))
+                return
+        if resp.status not in (200, 206, 416):
+            print(f"失败: {url}\n  HTTP {resp.status}")
+            failed.append(url)
+        # 落后的响应直接断开，不再读取响应体
+        resp.close()
+        resp.release_conn()
+
+    executor = ThreadPoolExecutor(max_workers=len(mirrors))
+    futures = [executor.submit(attempt, url) for url in mirrors]
+    for _ in as_completed(futures):
+        if won.is_set():
+            break
+    # 不等待较慢的下载源，它们发现已有胜出者后会自行关闭连接
+    executor.shutdown(wait=False)
+
+    with lock:
+        return (winner[0] if winner else None), failed
+
+
+def _fetch(resp, part_path, downloaded):
+    """把响应体写入 .part 文件，返回完整文件的sha256"""
+    if resp.status == 416:
+        # 请求范围超出文件大小，说明 .part 已经完整
+        return _hash_file(part_path)
+
+    h = hashlib.sha256()
+    if resp.status == 200:
+        # 服务器不支持断点续传，从头开始
+        downloaded = 0
+    elif downloaded:
+        print(f"断点续传: 从 {downloaded} 字节继续")
+        with open(part_path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+
+    length = int(resp.headers.get("Content-Length", -1))
+    total_size = downloaded + length if length >= 0 else -1
+    with open(part_path, "ab" if resp.status == 206 else "wb") as f:
+        for chunk in resp.stream(CHUNK_SIZE):
+            h.update(chunk)
+            f.write(chunk)
+            downloaded += len(chunk)
+            progress(downloaded, total_size)
+    return h.hexdigest()
+
+
+def _load_part_source(part_path):
+    """读取 .part 文件的来源 {url, etag}，没有记录时返回空字典"""
+    try:
+        return json.loads(part_path.with_name(part_path.name + ".json").read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_part_source(part_path, url, etag):
+    """记录 .part 文件来自哪个下载源及其内容标识，续传时只向同一来源请求剩余部分"""
+    part_path.with_name(part_path.name + ".json").write_text(json.dumps({"url": url, "etag": etag}))
+
+
+def _remove_part(part_path):
+    """删除 .part 文件及其来源记录"""
+    for path in (part_path, part_path.with_name(part_path.name + ".json")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _cache_dir():
+    """用户级模型缓存目录，同一台机器上的多个项目副本共享"""
+    cache_root = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return cache_root / "video_cut" / "models"
+
+
+def _cached_path(cache_dir, digest):
+    """按内容sha256命名的缓存文件"""
+    return cache_dir / f"yolov8n-{digest[:16]}.onnx"
+
+
+def _link_from_cache(cache_file, save_path):
+    """把缓存文件硬链接到 save_path，跨设备时退化为复制"""
+    tmp_path = save_path.with_name(save_path.name + ".tmp")
+    if tmp_path.exists():
+        os.remove(tmp_path)
+    try:
+        os.link(cache_file, tmp_path)
+    except OSError:
+        shutil.copy2(cache_file, tmp_path)
+    os.replace(tmp_path, save_path)
+
+
 def download():
     save_dir = Path(__file__).parent / "models"
     save_dir.mkdir(exist_ok=True)
     save_path = save_dir / "yolov8n.onnx"
 
     if save_path.exists():
-        print(f"模型已存在: {save_path}")
-        return
+        meta = _load_meta(save_path)
+        if not _verify_existing(save_path, meta):
+            # 损坏的模型在新文件下载完成后被原子替换
+            print(f"模型校验失败，重新下载: {save_path}")
+        elif _is_up_to_date(meta):
+            print(f"模型已存在: {save_path}")
+            return
+        else:
+            # 旧模型保留到新模型下载完成后再替换
+            print(f"远程模型已更新，重新下载: {save_path}")
+
+    cache_dir = _cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # 未完成的下载先写入缓存目录下的 .part 文件，中断后可以断点续传；
+    # 只有校验通过后才用 os.replace 原子地改名，所以 save_path 存在即代表下载完整
+    part_path = cache_dir / (save_path.name + ".part")
+
+    mirrors = list(MODEL_URLS)
+    while mirrors:
+        downloaded = part_path.stat().st_size if part_path.exists() else 0
+        source = _load_part_source(part_path) if downloaded else {}
+        if downloaded and not source:
+            # 来源不明的 .part 无法安全续传
+            _remove_part(part_path)
+            downloaded = 0
 
-    for url in MODEL_URLS:
+        # 各下载源是不同仓库的不同文件，只有 .part 的来源才能续传，其余从头下载
+        def headers_for(url):
+            if downloaded and url == source.get("url"):
+                return {"Range": f"bytes={downloaded}-"}
+            return {}
+
+        print(f"尝试下载 ({len(mirrors)} 个下载源)...")
+        winner, failed = _race(mirrors, headers_for)
+        mirrors = [m for m in mirrors if m not in failed]
+        if winner is None:
+            break
+
+        url, linked_sha256, etag, resp = winner
+        if resp.status != 200 and etag != source.get("etag"):
+            # 同一地址的远程文件已更新，旧的 .part 不能拼接，丢弃后重新请求
+            resp.close()
+            resp.release_conn()
+            _remove_part(part_path)
+            continue
+        mirrors = [m for m in mirrors if m != url]
+
+        cache_file = _cached_path(cache_dir, linked_sha256) if linked_sha256 else None
+        if cache_file and cache_file.exists():
+            # 服务器声明的内容已在缓存中，不必下载响应体
+            resp.close()
+            resp.release_conn()
+            _link_from_cache(cache_file, save_path)
+            _save_meta(save_path, url=url, etag=etag, sha256=linked_sha256)
+            print(f"使用缓存的模型: {cache_file}")
+            return
+
+        print(f"使用下载源: {url}")
+        _save_part_source(part_path, url, etag)
         try:
-            print(f"尝试下载: {url}")
-            urllib.request.urlretrieve(url, save_path, reporthook=progress)
+            try:
+                digest = _fetch(resp, part_path, downloaded)
+            finally:
+                resp.release_conn()
+
+            if linked_sha256 and digest != linked_sha256:
+                # 内容与期望不符，删除后换下一个下载源
+                _remove_part(part_path)
+                raise IOError(f"sha256 校验失败: {digest} != {linked_sha256}")
+            if not _looks_like_onnx(part_path):
+                _remove_part(part_path)
+                raise IOError("下载的文件不是有效的ONNX模型")
+
+            cache_file = _cached_path(cache_dir, digest)
+            os.replace(part_path, cache_file)
+            _remove_part(part_path)
+            _link_from_cache(cache_file, save_path)
+            _save_meta(save_path, url=url, etag=etag, sha256=digest)
             print(f"\n下载完成: {save_path}")
             return
         except Exception as e:
+            # 保留 .part 文件及其来源，下次运行时可向同一下载源续传；其他下载源从头下载
             print(f"\n失败: {e}")
-            if save_path.exists():
-                os.remove(save_path)
 
     print("\n所有下载源均失败!")
     print("请手动下载 yolov8n.onnx 并放入 models 文件夹")
     print("GitHub: https://github.com/ultralytics/assets/releases")
 
-def progress(count, block_size, total_size):
-    percent = count * block_size * 100 // total_size
-    print(f"\r下载进度: {percent}%", end="", flush=True)
+def progress(downloaded, total_size, _state=[-1]):
+    """打印下载进度，百分比不变时不输出；总大小未知时显示已下载的MB数"""
+    if total_size > 0:
+        percent = downloaded * 100 // total_size
+        if percent == _state[0]:
+            return
+        _state[0] = percent
+        sys.stdout.write(f"\r下载进度: {percent}%")
+    else:
+        sys.stdout.write(f"\r已下载: {downloaded / (1 << 20):.1f} MB")
+    sys.stdout.flush()
 
 if __name__ == "__main__":
     download()
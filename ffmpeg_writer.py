@@ -0,0 +1,110 @@
+"""
+FFmpeg 视频写入 - 通过管道把 BGR 帧交给 ffmpeg 编码（优先 NVENC，其次 libx264）
+"""
+
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+
+# 编码器优先级：(ffmpeg 编码参数)
+ENCODERS = [
+    ['-c:v', 'h264_nvenc', '-preset', 'p1'],
+    ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23'],
+]
+
+
+@lru_cache(maxsize=1)
+def find_encoder():
+    """返回本机可用的编码参数，没有 ffmpeg 或均不可用时返回 None（结果缓存）"""
+    if not shutil.which('ffmpeg'):
+        return None
+    for args in ENCODERS:
+        # 编码器列在 -encoders 里不代表能用（如没有 NVIDIA 显卡），实际编一帧试试
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+               '-f', 'lavfi', '-i', 'color=s=256x256', '-frames:v', '1',
+               *args, '-f', 'null', '-']
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        if result.returncode == 0:
+            return args
+    return None
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg 编码进程异常退出（参数错误、磁盘已满等），消息中带有 ffmpeg 的错误输出"""
+
+
+class FFmpegWriter:
+    """接口与 cv2.VideoWriter 一致的 ffmpeg 管道写入器"""
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int], encoder_args: list):
+        width, height = size
+        # yuv420p 要求宽高为偶数（libx264 和 NVENC 都拒绝奇数尺寸），奇数时在右侧/底部补一行黑边
+        pad_args = ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2'] if width % 2 or height % 2 else []
+        cmd = [
+            'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{fps}',
+            '-i', '-',
+            *pad_args, *encoder_args, '-pix_fmt', 'yuv420p',
+            path,
+        ]
+        # -loglevel error 下只有出错时才有输出，写到临时文件，不会像管道那样写满阻塞
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def isOpened(self) -> bool:
+        return self.proc.poll() is None
+
+    def write(self, frame: np.ndarray):
+        # ndarray 支持缓冲区协议，连续内存直接写入管道，无需 tobytes() 拷贝
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame).data)
+        except OSError:
+            # ffmpeg 已退出（管道断开）
+            self.proc.wait()
+            raise self._error() from None
+
+    def release(self):
+        """写完所有帧后调用，等待 ffmpeg 完成封装；ffmpeg 失败时抛出 FFmpegError"""
+        if self.proc.stdin:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        self.proc.wait()
+        try:
+            if self.proc.returncode != 0:
+                raise self._error()
+        finally:
+            self._stderr.close()
+
+    def kill(self):
+        """中止编码（取消导出时使用，输出文件不完整）"""
+        self.proc.kill()
+        self.proc.wait()
+        self._stderr.close()
+
+    def _error(self) -> FFmpegError:
+        """按退出码和 ffmpeg 最后几行错误输出构造异常"""
+        self._stderr.seek(0)
+        lines = self._stderr.read().decode(errors='replace').strip().splitlines()
+        detail = "; ".join(lines[-5:]) or "无错误输出"
+        return FFmpegError(f"ffmpeg 编码失败 (退出码 {self.proc.returncode}): {detail}")
+
+
+def open_video_writer(path: str, fps: float, size: Tuple[int, int]):
+    """打开视频写入器：有可用的 ffmpeg 编码器时用管道，否则退回 cv2.VideoWriter(mp4v)"""
+    encoder_args = find_encoder()
+    if encoder_args is not None:
+        return FFmpegWriter(path, fps, size, encoder_args)
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(path, fourcc, fps, size)
@@ -2,8 +2,12 @@
 视频剪切工具 - 时间范围选择 + 区域裁剪
 """
 
+import os
 import sys
-import time
+import queue
+import shutil
+import subprocess
+import threading
 import cv2
 import numpy as np
 from pathlib import Path
@@ -15,8 +19,373 @@ from PyQt5.QtWidgets import (
     QProgressDialog, QSizePolicy, QComboBox, QButtonGroup, QRadioButton,
     QListWidget, QListWidgetItem, QSplitter, QFrame
 )
-from PyQt5.QtCore import Qt, QRect, QPoint, pyqtSignal, QTimer
-from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QFont, QPen, QCursor
+from PyQt5.QtCore import (
+    Qt, QRect, QPoint, pyqtSignal, pyqtSlot, QTimer, QObject, QThread,
+    QMutex, QMutexLocker, QMetaObject, QElapsedTimer, QEventLoop
+)
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QFont, QPen, QCursor, QRegion, QPainterPath, QPixmapCache
+
+try:
+    from PyQt5 import sip
+except ImportError:
+    import sip  # PyQt5 < 5.11
+
+from ffmpeg_writer import FFmpegError, FFmpegWriter, open_video_writer
+
+try:
+    import av  # PyAV 可选，用于预览和导出的解码
+except ImportError:
+    av = None
+
+try:
+    from numba import njit
+except ImportError:
+    # 未安装 numba 时退化为普通 Python 函数
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# 向前跳转不超过该帧数时用 grab() 逐帧前进，避免 set() 触发关键帧重新定位
+SEEK_GRAB_LIMIT = 30
+
+# 视频旋转元数据 (PyAV frame.rotation，逆时针角度) 对应的 cv2.rotate 参数，
+# 旋转后与 OpenCV 默认自动旋转的方向和尺寸一致
+AV_ROTATE_CODES = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+}
+
+# QImage.Format_BGR888 需要 Qt 5.14+，更早的版本退回 cvtColor + RGB888
+HAS_BGR888 = hasattr(QImage, 'Format_BGR888')
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'}
+
+# 文件列表每批填充的项数，批次之间让出事件循环
+LIST_BATCH = 200
+
+# 导出时解码线程最多领先编码的帧数（吸收编码器耗时的抖动）
+EXPORT_READ_AHEAD = 16
+
+# 预览帧 QPixmapCache 容量（KB），缓存的是缩放到预览尺寸后的 QPixmap（约 1000px 宽时每帧约 2MB）
+PIXMAP_CACHE_KB = 256 * 1024
+
+# 裁剪框拖动点：四角在前、四边中点在后（命中时角优先），与光标形状一一对应
+HANDLE_NAMES = ('tl', 'tr', 'bl', 'br', 't', 'b', 'l', 'r')
+HANDLE_CURSORS = (Qt.SizeFDiagCursor, Qt.SizeBDiagCursor, Qt.SizeBDiagCursor, Qt.SizeFDiagCursor,
+                  Qt.SizeVerCursor, Qt.SizeVerCursor, Qt.SizeHorCursor, Qt.SizeHorCursor)
+
+# 固定宽高比缩放时的锚点编码：按位表示固定的边
+ANCHOR_TOP, ANCHOR_BOTTOM, ANCHOR_LEFT, ANCHOR_RIGHT = 1, 2, 4, 8
+ANCHOR_CODES = {
+    'tl': ANCHOR_TOP | ANCHOR_LEFT, 't': ANCHOR_TOP, 'tr': ANCHOR_TOP | ANCHOR_RIGHT,
+    'bl': ANCHOR_BOTTOM | ANCHOR_LEFT, 'b': ANCHOR_BOTTOM, 'br': ANCHOR_BOTTOM | ANCHOR_RIGHT,
+    'l': ANCHOR_LEFT, 'r': ANCHOR_RIGHT,
+}
+
+
+@njit(cache=True)
+def _clamp_aspect(x, y, w, h, ratio, min_size, anchor_code):
+    """
+    固定宽高比下按锚点缩放裁剪区域
+    返回 (ok, x, y, w, h)，ok 为 False 表示超出边界，保持原裁剪区域不变
+    """
+    # 限制最小尺寸
+    w = max(min_size, w)
+    h = max(min_size, h)
+
+    # 保持宽高比（以较小的变化为准）
+    if w / h > ratio:
+        w = h * ratio
+    else:
+        h = w / ratio
+
+    # 根据锚点确定哪些边界是固定的
+    if anchor_code & 1:
+        # 上边固定，检查下边界
+        if y + h > 1:
+            h = 1 - y
+            w = h * ratio
+    if anchor_code & 2:
+        # 下边固定，检查上边界
+        if y < 0:
+            return False, x, y, w, h
+    if anchor_code & 4:
+        # 左边固定，检查右边界
+        if x + w > 1:
+            w = 1 - x
+            h = w / ratio
+    if anchor_code & 8:
+        # 右边固定，检查左边界
+        if x < 0:
+            return False, x, y, w, h
+
+    # 检查尺寸是否有效
+    if w < min_size or h < min_size:
+        return False, x, y, w, h
+
+    # 最终边界检查
+    if x < 0 or y < 0 or x + w > 1 or y + h > 1:
+        return False, x, y, w, h
+
+    return True, x, y, w, h
+
+
+def seek_capture(cap, frame_idx):
+    """定位到指定帧，小范围向前跳转时只grab不解码"""
+    pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if 0 <= frame_idx - pos <= SEEK_GRAB_LIMIT:
+        for _ in range(frame_idx - pos):
+            cap.grab()
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+
+
+class CvFrameReader:
+    """基于 cv2.VideoCapture 的按帧号读帧"""
+
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except cv2.error:
+            pass
+
+    def read(self, frame_idx, size=None):
+        """读取指定帧（BGR），给出 size=(宽, 高) 时缩放到该尺寸，失败返回 None"""
+        seek_capture(self.cap, frame_idx)
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        if size is not None and size != (frame.shape[1], frame.shape[0]):
+            interp = cv2.INTER_AREA if size[0] < frame.shape[1] else cv2.INTER_LINEAR
+            frame = cv2.resize(frame, size, interpolation=interp)
+        return frame
+
+    def release(self):
+        self.cap.release()
+
+
+class AVFrameReader:
+    """
+    基于 PyAV 的按帧号读帧
+    seek 到目标之前的关键帧再向前解码；小步向前时沿用当前解码位置，不重新 seek
+    PyAV 不处理旋转元数据，这里按 OpenCV 的方式旋转，保证与播放、裁剪使用的宽高一致
+    """
+
+    def __init__(self, path):
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = 'AUTO'
+        self.fps = float(self.stream.average_rate or 30)
+        self.start_sec = float(self.stream.start_time * self.stream.time_base) if self.stream.start_time else 0.0
+        self._decoded = None  # 当前解码迭代器
+        self._next_idx = None  # 迭代器下一帧的帧号
+
+    def read(self, frame_idx, size=None):
+        """读取指定帧（BGR），给出 size=(宽, 高) 时缩放到该尺寸，失败返回 None"""
+        if self._next_idx is None or not 0 <= frame_idx - self._next_idx <= SEEK_GRAB_LIMIT:
+            sec = self.start_sec + frame_idx / self.fps
+            self.container.seek(int(sec / self.stream.time_base), stream=self.stream, backward=True)
+            self._decoded = self.container.decode(self.stream)
+
+        for frame in self._decoded:
+            idx = round((frame.time - self.start_sec) * self.fps)
+            if idx >= frame_idx:
+                self._next_idx = idx + 1
+                rotate = AV_ROTATE_CODES.get(frame.rotation % 360)
+                if size is None:
+                    image = frame.to_ndarray(format='bgr24')
+                else:
+                    # 缩放和转 BGR 在 swscale 里一次完成，不必先转出全分辨率的帧再缩小；
+                    # 转 90 度时 size 是旋转后的尺寸，缩放时宽高对调
+                    w, h = size if rotate in (None, cv2.ROTATE_180) else (size[1], size[0])
+                    interp = 'AREA' if w < frame.width else 'BILINEAR'
+                    image = frame.to_ndarray(format='bgr24', width=w, height=h, interpolation=interp)
+                return image if rotate is None else cv2.rotate(image, rotate)
+
+        self._next_idx = None
+        return None
+
+    def release(self):
+        self.container.close()
+
+
+def open_frame_reader(path):
+    """优先用 PyAV 打开视频，未安装或打开失败时用 OpenCV"""
+    if av is not None:
+        try:
+            return AVFrameReader(path)
+        except (av.FFmpegError, IndexError):
+            pass
+    return CvFrameReader(path)
+
+
+def read_frames(path, start_frame, total, frames, stop):
+    """导出用解码线程：顺序读取 total 帧放入队列，读完或解码出错后放入 None"""
+    reader = None
+    try:
+        reader = open_frame_reader(path)
+        for i in range(total):
+            frame = reader.read(start_frame + i)
+            if frame is None:
+                break
+            if not _put_until_stopped(frames, frame, stop):
+                return
+    finally:
+        if reader is not None:
+            reader.release()
+        # 出异常（如损坏的数据包）也要放入结束标记，否则导出线程会一直等待
+        _put_until_stopped(frames, None, stop)
+
+
+def _put_until_stopped(frames, item, stop):
+    """放入有界队列，队列满时等待直到成功或收到停止信号"""
+    while not stop.is_set():
+        try:
+            frames.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+class DecodeWorker(QObject):
+    """后台线程解码预览帧，只保留最新的请求"""
+
+    frameReady = pyqtSignal(int, object)  # (帧号, BGR帧)
+    _wake = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.reader = None
+        self._mutex = QMutex()
+        self._pending_idx = None
+        self._pending_size = None
+        self._wake.connect(self._process)
+
+    @pyqtSlot(str)
+    def open(self, path):
+        """在工作线程中打开独立的读帧器"""
+        if self.reader:
+            self.reader.release()
+        self.reader = open_frame_reader(path)
+
+    @pyqtSlot()
+    def close(self):
+        if self.reader:
+            self.reader.release()
+            self.reader = None
+
+    def request(self, frame_idx, size=None):
+        """请求解码指定帧并缩放到 size（任意线程调用），新请求覆盖尚未处理的旧请求"""
+        with QMutexLocker(self._mutex):
+            idle = self._pending_idx is None
+            self._pending_idx = frame_idx
+            self._pending_size = size
+        if idle:
+            self._wake.emit()
+
+    @pyqtSlot()
+    def _process(self):
+        while True:
+            with QMutexLocker(self._mutex):
+                frame_idx = self._pending_idx
+                size = self._pending_size
+                self._pending_idx = None
+            if frame_idx is None or not self.reader:
+                return
+            frame = self.reader.read(frame_idx, size)
+            if frame is not None:
+                self.frameReady.emit(frame_idx, frame)
+
+
+class ExportWorker(QObject):
+    """后台线程导出：解码线程读帧，本线程裁剪并编码写入"""
+
+    progress = pyqtSignal(int, int)  # (已完成帧数, 总帧数)
+    finished = pyqtSignal(bool, str)  # (是否被取消, 出错时的错误信息，成功或取消时为空)
+
+    def __init__(self, video_path, save_path, start_frame, total, fps, crop_rect):
+        super().__init__()
+        self.video_path = video_path
+        self.save_path = save_path
+        self.start_frame = start_frame
+        self.total = total
+        self.fps = fps
+        self.crop_rect = crop_rect  # (x, y, w, h) 像素
+        self._stop = threading.Event()
+
+    def cancel(self):
+        """请求取消（任意线程调用）"""
+        self._stop.set()
+
+    @pyqtSlot()
+    def run(self):
+        cx, cy, cw, ch = self.crop_rect
+        writer = None
+        reader = None
+        # 出错（包括中途抛出异常）时清理线程和编码器，由界面删除不完整的文件并显示错误
+        canceled = False
+        error = ""
+        try:
+            writer = open_video_writer(self.save_path, self.fps, (cw, ch))
+            cropped = np.empty((ch, cw, 3), dtype=np.uint8)
+
+            # 解码放到独立线程，通过有界队列与裁剪/编码重叠进行
+            frames = queue.Queue(maxsize=EXPORT_READ_AHEAD)
+            reader = threading.Thread(
+                target=read_frames, args=(self.video_path, self.start_frame, self.total, frames, self._stop),
+                daemon=True
+            )
+            reader.start()
+
+            done = 0
+            while not self._stop.is_set():
+                try:
+                    frame = frames.get(timeout=0.1)
+                except queue.Empty:
+                    # 解码线程已退出且没有剩余帧，不再等待
+                    if not reader.is_alive() and frames.empty():
+                        break
+                    continue
+                if frame is None:
+                    break
+
+                # 解码出的帧比裁剪区域小（与打开视频时读到的尺寸不一致），无法裁剪
+                if frame.shape[0] < cy + ch or frame.shape[1] < cx + cw:
+                    error = f"解码帧尺寸 {frame.shape[1]}x{frame.shape[0]} 小于裁剪区域"
+                    break
+
+                # 裁剪：拷贝到复用的连续缓冲，避免每帧分配
+                np.copyto(cropped, frame[cy:cy+ch, cx:cx+cw])
+                try:
+                    writer.write(cropped)
+                except FFmpegError as e:
+                    error = str(e)
+                    break
+                done += 1
+                self.progress.emit(done, self.total)
+
+            canceled = self._stop.is_set()
+        except Exception as e:
+            # 槽函数里的异常不能抛给 Qt，转为错误状态
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self._stop.set()
+            if reader is not None:
+                reader.join()
+            if writer is not None:
+                if (canceled or error) and isinstance(writer, FFmpegWriter):
+                    writer.kill()
+                else:
+                    try:
+                        writer.release()
+                    except FFmpegError as e:
+                        # 封装失败（磁盘已满等）
+                        error = str(e)
+            self.finished.emit(canceled and not error, error)
 
 
 class RangeSlider(QWidget):
@@ -43,12 +412,14 @@ class RangeSlider(QWidget):
         self.setMouseTracking(True)
 
     def setRange(self, min_val, max_val):
+        """重置范围和三个滑块，只发一次 previewChanged 供外部刷新预览"""
         self._min = min_val
         self._max = max_val
         self._start = min_val
         self._end = max_val
         self._preview = min_val
         self.update()
+        self.previewChanged.emit(self._preview)
 
     def setStart(self, val):
         self._start = max(self._min, min(val, self._end - 1))
@@ -172,21 +543,41 @@ class RangeSlider(QWidget):
         self._pressing_preview = False
 
     def mouseMoveEvent(self, event):
+        if not (self._pressing_start or self._pressing_end or self._pressing_preview):
+            return
+
+        # 位置换算与边界钳制合并为一步，只重绘一次、只发一次信号
+        width = max(self.width() - 30, 1)
+        ratio = max(0.0, min(1.0, (event.x() - 15) / width))
+        val = int(self._min + ratio * (self._max - self._min))
+
         if self._pressing_start:
-            val = self._pos_to_value(event.x())
-            self.setStart(val)
+            val = min(val, self._end - 1)
+            if val == self._start:
+                return
+            self._start = val
+            signal = self.startChanged
         elif self._pressing_end:
-            val = self._pos_to_value(event.x())
-            self.setEnd(val)
-        elif self._pressing_preview:
-            val = self._pos_to_value(event.x())
-            self.setPreview(val)
+            val = max(val, self._start + 1)
+            if val == self._end:
+                return
+            self._end = val
+            signal = self.endChanged
+        else:
+            if val == self._preview:
+                return
+            self._preview = val
+            signal = self.previewChanged
+
+        self.update()
+        signal.emit(val)
 
 
 class CropLabel(QLabel):
     """支持区域选择的预览标签"""
 
     cropChanged = pyqtSignal(tuple)  # (x, y, w, h) 归一化坐标
+    resized = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -210,6 +601,27 @@ class CropLabel(QLabel):
         # 图像尺寸
         self._img_rect = QRect()
 
+        # 原始预览图及按当前控件尺寸缩放后的缓存，拖动裁剪框重绘时直接贴图
+        self._pixmap = None
+        self._scaled_cache = None
+        self._scaled_key = None
+
+        # 拖动点坐标缓存，裁剪框不变时绘制/点击/移动共用
+        self._handles_cache = None
+        self._handles_key = None
+        self._handles_paths = None  # (四角路径, 四边中点路径)，随拖动点坐标一起失效
+
+        # 合并重绘请求，拖动时最多每 16ms（约60Hz）重绘一次
+        self._repaint_timer = QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setInterval(16)
+        self._repaint_timer.timeout.connect(self.update)
+
+    def _scheduleRepaint(self):
+        """请求一次延迟重绘，定时器未到期前的重复请求直接合并"""
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+
     def setAspectRatio(self, ratio):
         """设置宽高比约束，None为自由模式"""
         self._aspect_ratio = ratio
@@ -247,7 +659,7 @@ class CropLabel(QLabel):
         self._crop_x = max(0, min(self._crop_x, 1 - self._crop_w))
         self._crop_y = max(0, min(self._crop_y, 1 - self._crop_h))
 
-        self.update()
+        self._scheduleRepaint()
         self.cropChanged.emit(self.getCrop())
 
     def setCrop(self, x, y, w, h, anchor=None):
@@ -287,42 +699,9 @@ class CropLabel(QLabel):
                 # 尺寸不变
             else:
                 # 调整大小模式
-                # 限制最小尺寸
-                w = max(min_size, w)
-                h = max(min_size, h)
-
-                # 保持宽高比（以较小的变化为准）
-                if w / h > target_ratio:
-                    w = h * target_ratio
-                else:
-                    h = w / target_ratio
-
-                # 根据锚点确定哪些边界是固定的
-                if anchor in ('tl', 't', 'tr'):
-                    # 上边固定，检查下边界
-                    if y + h > 1:
-                        h = 1 - y
-                        w = h * target_ratio
-                if anchor in ('bl', 'b', 'br'):
-                    # 下边固定，检查上边界
-                    if y < 0:
-                        return
-                if anchor in ('tl', 'l', 'bl'):
-                    # 左边固定，检查右边界
-                    if x + w > 1:
-                        w = 1 - x
-                        h = w / target_ratio
-                if anchor in ('tr', 'r', 'br'):
-                    # 右边固定，检查左边界
-                    if x < 0:
-                        return
-
-                # 检查尺寸是否有效
-                if w < min_size or h < min_size:
-                    return
-
-                # 最终边界检查
-                if x < 0 or y < 0 or x + w > 1 or y + h > 1:
+                ok, x, y, w, h = _clamp_aspect(float(x), float(y), float(w), float(h),
+                                               target_ratio, min_size, ANCHOR_CODES[anchor])
+                if not ok:
                     return
 
                 self._crop_x = x
@@ -330,7 +709,7 @@ class CropLabel(QLabel):
                 self._crop_w = w
                 self._crop_h = h
 
-        self.update()
+        self._scheduleRepaint()
         self.cropChanged.emit(self.getCrop())
 
     def getCrop(self):
@@ -340,16 +719,34 @@ class CropLabel(QLabel):
         self.setCrop(0, 0, 1, 1)
 
     def setPixmap(self, pixmap):
-        super().setPixmap(pixmap)
+        # 图像由 paintEvent 自行绘制，QLabel 只负责背景和边框
+        self._pixmap = pixmap
+        self._scaled_cache = None
+        self._scaled_key = None
         self._updateImgRect()
+        self._scheduleRepaint()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self._updateImgRect()
+        self.resized.emit()
+
+    def _scaledPixmap(self):
+        """返回适配当前控件尺寸的预览图，按 (图像, 控件尺寸) 缓存"""
+        if self._pixmap is None or self._pixmap.isNull():
+            return None
+        key = (self._pixmap.cacheKey(), self.width(), self.height())
+        if key != self._scaled_key:
+            pixmap = self._pixmap
+            if pixmap.width() > self.width() or pixmap.height() > self.height():
+                pixmap = pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._scaled_cache = pixmap
+            self._scaled_key = key
+        return self._scaled_cache
 
     def _updateImgRect(self):
         """更新图像在label中的实际位置"""
-        pixmap = self.pixmap()
+        pixmap = self._scaledPixmap()
         if pixmap and not pixmap.isNull():
             pw, ph = pixmap.width(), pixmap.height()
             lw, lh = self.width(), self.height()
@@ -385,54 +782,58 @@ class CropLabel(QLabel):
             return
 
         painter = QPainter(self)
+        painter.drawPixmap(self._img_rect.topLeft(), self._scaledPixmap())
         crop_rect = self._crop_to_widget()
 
-        # 半透明遮罩
-        painter.setBrush(QColor(0, 0, 0, 120))
-        painter.setPen(Qt.NoPen)
-
-        # 上
-        painter.drawRect(self._img_rect.x(), self._img_rect.y(),
-                        self._img_rect.width(), crop_rect.y() - self._img_rect.y())
-        # 下
-        painter.drawRect(self._img_rect.x(), crop_rect.bottom(),
-                        self._img_rect.width(), self._img_rect.bottom() - crop_rect.bottom())
-        # 左
-        painter.drawRect(self._img_rect.x(), crop_rect.y(),
-                        crop_rect.x() - self._img_rect.x(), crop_rect.height())
-        # 右
-        painter.drawRect(crop_rect.right(), crop_rect.y(),
-                        self._img_rect.right() - crop_rect.right(), crop_rect.height())
+        # 半透明遮罩：图像区域减去裁剪区域，一次填充
+        painter.save()
+        painter.setClipRegion(QRegion(self._img_rect).subtracted(QRegion(crop_rect)))
+        painter.fillRect(self._img_rect, QColor(0, 0, 0, 120))
+        painter.restore()
 
         # 裁剪边框
         painter.setPen(QPen(QColor(0, 255, 0), 2))
         painter.setBrush(Qt.NoBrush)
         painter.drawRect(crop_rect)
 
-        # 四个角的拖动点
-        handle_size = 10
+        # 拖动点：四个角和四条边的中点各一条路径
+        corner_path, edge_path = self._getHandlePaths(crop_rect)
         painter.setBrush(QColor(0, 255, 0))
-        corners = [
-            (crop_rect.topLeft(), 'tl'),
-            (crop_rect.topRight(), 'tr'),
-            (crop_rect.bottomLeft(), 'bl'),
-            (crop_rect.bottomRight(), 'br'),
-        ]
-        for point, _ in corners:
-            painter.drawRect(point.x() - handle_size // 2, point.y() - handle_size // 2,
-                            handle_size, handle_size)
-
-        # 四条边的中点
+        painter.drawPath(corner_path)
         painter.setBrush(QColor(0, 200, 0))
-        edges = [
-            (QPoint(crop_rect.center().x(), crop_rect.top()), 't'),
-            (QPoint(crop_rect.center().x(), crop_rect.bottom()), 'b'),
-            (QPoint(crop_rect.left(), crop_rect.center().y()), 'l'),
-            (QPoint(crop_rect.right(), crop_rect.center().y()), 'r'),
-        ]
-        for point, _ in edges:
-            painter.drawRect(point.x() - handle_size // 2, point.y() - handle_size // 2,
-                            handle_size, handle_size)
+        painter.drawPath(edge_path)
+
+    def _getHandles(self, crop_rect):
+        """返回8个拖动点坐标 (8x2 int32，顺序同 HANDLE_NAMES)，按裁剪框缓存"""
+        key = (crop_rect.x(), crop_rect.y(), crop_rect.width(), crop_rect.height())
+        if key != self._handles_key:
+            l, t, r, b = crop_rect.left(), crop_rect.top(), crop_rect.right(), crop_rect.bottom()
+            cx, cy = crop_rect.center().x(), crop_rect.center().y()
+            self._handles_cache = np.array([[l, t], [r, t], [l, b], [r, b],
+                                            [cx, t], [cx, b], [l, cy], [r, cy]], dtype=np.int32)
+            self._handles_key = key
+            self._handles_paths = None
+        return self._handles_cache
+
+    def _getHandlePaths(self, crop_rect, handle_size=10):
+        """返回拖动点的绘制路径 (四角, 四边中点)，裁剪框不变时复用"""
+        handles = self._getHandles(crop_rect).tolist()
+        if self._handles_paths is None:
+            half = handle_size // 2
+            paths = []
+            for group in (handles[:4], handles[4:]):
+                path = QPainterPath()
+                for x, y in group:
+                    path.addRect(x - half, y - half, handle_size, handle_size)
+                paths.append(path)
+            self._handles_paths = tuple(paths)
+        return self._handles_paths
+
+    def _hitHandle(self, crop_rect, pos, handle_size=15):
+        """返回 pos 命中的拖动点下标（对应 HANDLE_NAMES），未命中返回 -1"""
+        pts = self._getHandles(crop_rect)
+        hits = np.abs(pts - (pos.x(), pos.y())).max(axis=1) < handle_size
+        return int(np.argmax(hits)) if hits.any() else -1
 
     def mousePressEvent(self, event):
         if event.button() != Qt.LeftButton:
@@ -440,34 +841,13 @@ class CropLabel(QLabel):
 
         pos = event.pos()
         crop_rect = self._crop_to_widget()
-        handle_size = 15
 
         # 检测点击位置
-        corners = {
-            'tl': crop_rect.topLeft(),
-            'tr': crop_rect.topRight(),
-            'bl': crop_rect.bottomLeft(),
-            'br': crop_rect.bottomRight(),
-        }
-        edges = {
-            't': QPoint(crop_rect.center().x(), crop_rect.top()),
-            'b': QPoint(crop_rect.center().x(), crop_rect.bottom()),
-            'l': QPoint(crop_rect.left(), crop_rect.center().y()),
-            'r': QPoint(crop_rect.right(), crop_rect.center().y()),
-        }
-
-        for name, point in corners.items():
-            if abs(pos.x() - point.x()) < handle_size and abs(pos.y() - point.y()) < handle_size:
-                self._dragging = name
-                break
-        else:
-            for name, point in edges.items():
-                if abs(pos.x() - point.x()) < handle_size and abs(pos.y() - point.y()) < handle_size:
-                    self._dragging = name
-                    break
-            else:
-                if crop_rect.contains(pos):
-                    self._dragging = 'move'
+        idx = self._hitHandle(crop_rect, pos)
+        if idx >= 0:
+            self._dragging = HANDLE_NAMES[idx]
+        elif crop_rect.contains(pos):
+            self._dragging = 'move'
 
         if self._dragging:
             self._drag_start = pos
@@ -483,34 +863,13 @@ class CropLabel(QLabel):
 
         # 更新光标
         if not self._dragging:
-            handle_size = 15
-            corners = {'tl': crop_rect.topLeft(), 'tr': crop_rect.topRight(),
-                      'bl': crop_rect.bottomLeft(), 'br': crop_rect.bottomRight()}
-            edges = {'t': QPoint(crop_rect.center().x(), crop_rect.top()),
-                    'b': QPoint(crop_rect.center().x(), crop_rect.bottom()),
-                    'l': QPoint(crop_rect.left(), crop_rect.center().y()),
-                    'r': QPoint(crop_rect.right(), crop_rect.center().y())}
-
-            cursor = Qt.ArrowCursor
-            for name, point in corners.items():
-                if abs(pos.x() - point.x()) < handle_size and abs(pos.y() - point.y()) < handle_size:
-                    if name in ('tl', 'br'):
-                        cursor = Qt.SizeFDiagCursor
-                    else:
-                        cursor = Qt.SizeBDiagCursor
-                    break
+            idx = self._hitHandle(crop_rect, pos)
+            if idx >= 0:
+                cursor = HANDLE_CURSORS[idx]
+            elif crop_rect.contains(pos):
+                cursor = Qt.SizeAllCursor
             else:
-                for name, point in edges.items():
-                    if abs(pos.x() - point.x()) < handle_size and abs(pos.y() - point.y()) < handle_size:
-                        if name in ('t', 'b'):
-                            cursor = Qt.SizeVerCursor
-                        else:
-                            cursor = Qt.SizeHorCursor
-                        break
-                else:
-                    if crop_rect.contains(pos):
-                        cursor = Qt.SizeAllCursor
-
+                cursor = Qt.ArrowCursor
             self.setCursor(cursor)
 
         # 拖动处理
@@ -608,26 +967,68 @@ class CropLabel(QLabel):
 class VideoCutWindow(QMainWindow):
     """视频剪切主窗口"""
 
+    openRequested = pyqtSignal(str)  # 通知解码线程打开视频
+    generatedSorted = pyqtSignal(int, object)  # (扫描序号, (目录, 目录mtime, 按修改时间排好序的生成文件))
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("视频剪切工具")
         self.setMinimumSize(1000, 800)
 
         self.video_path = None
-        self.cap = None
+        # 播放专用的顺序读取 capture；拖动预览由 DecodeWorker 用自己的读帧器解码，两者互不打乱位置
+        self.cap_play = None
         self.total_frames = 0
         self.fps = 30
         self.width = 0
         self.height = 0
+        self._prev_w = 0  # 预览显示尺寸
+        self._prev_h = 0
+        self._prev_interp = cv2.INTER_LINEAR
+        self._frame_ref = None  # 当前预览帧的 numpy 缓冲，QImage 共享其内存
+        self._resize_buf = None  # 播放时复用的缩放目标缓冲
+        QPixmapCache.setCacheLimit(PIXMAP_CACHE_KB)  # 拖动预览时复用已缩放的帧，见 _pixmap_key
+        self._awaiting_frame = None  # 等待解码线程返回的帧号
+
+        # 预览请求节流
+        self._pending_preview_idx = None
+        self._preview_debounce = QTimer(self)
+        self._preview_debounce.setSingleShot(True)
+        self._preview_debounce.setInterval(30)
+        self._preview_debounce.timeout.connect(self._do_pending_preview)
+
+        # 预览解码线程
+        self.decode_thread = QThread()
+        self.decode_worker = DecodeWorker()
+        self.decode_worker.moveToThread(self.decode_thread)
+        self.decode_worker.frameReady.connect(self._on_frame_ready)
+        self.openRequested.connect(self.decode_worker.open)
+        self.decode_thread.start()
 
         # 播放相关
         self.play_timer = QTimer()
+        self.play_timer.setSingleShot(True)
+        self.play_timer.setTimerType(Qt.PreciseTimer)
         self.play_timer.timeout.connect(self._on_play_timer)
+        self.play_clock = QElapsedTimer()  # 播放起点以来的时间
+        self.play_origin_frame = 0  # 播放起点帧
         self.is_playing = False
         self.play_speed = 1.0
         self.play_range_only = False
-        self.last_play_time = 0  # 上次播放的时间戳
-        self.frame_skip = 1  # 跳帧数
+        self.frame_skip = 1  # 每次至少前进的帧数
+        self.frame_interval_ns = 1  # 按当前速度每帧的时长（纳秒）
+
+        # 文件列表分批填充
+        self._list_scan_id = 0
+        self._populate_tokens = {}
+        self._dir_cache = {}  # 目录 -> (目录mtime, 排好序的 (文件名, 路径) 列表)
+        self._list_shown = {}  # 列表控件 -> 当前显示的条目列表
+        self.generatedSorted.connect(self._on_generated_sorted)
+
+        # 导出线程
+        self.export_thread = None
+        self.export_worker = None
+        self.export_progress = None
 
         self._setup_ui()
 
@@ -713,6 +1114,7 @@ class VideoCutWindow(QMainWindow):
             "background-color: #1a1a1a; color: #666; border: 1px solid #333;"
         )
         self.preview_label.cropChanged.connect(self._on_crop_changed)
+        self.preview_label.resized.connect(self._update_preview_size)
         preview_layout.addWidget(self.preview_label)
 
         # 裁剪信息和重置按钮
@@ -783,20 +1185,25 @@ class VideoCutWindow(QMainWindow):
 
         btn_layout.addSpacing(40)
 
-        # 播放控制 - 绿色播放，红色停止
-        self.play_green_style = "QPushButton { color: white; padding: 8px 15px; font-size: 13px; background-color: #4CAF50; min-width: 70px; } QPushButton:disabled { background-color: #555; color: #888; } QPushButton:hover { background-color: #388E3C; }"
-        self.play_red_style = "QPushButton { color: white; padding: 8px 15px; font-size: 13px; background-color: #F44336; min-width: 70px; } QPushButton:disabled { background-color: #555; color: #888; } QPushButton:hover { background-color: #D32F2F; }"
+        # 播放控制 - 绿色播放，红色停止（由 playing 属性切换，样式表只解析一次）
+        play_style = (
+            "QPushButton { color: white; padding: 8px 15px; font-size: 13px; background-color: #4CAF50; min-width: 70px; } "
+            "QPushButton:hover { background-color: #388E3C; } "
+            "QPushButton[playing=\"true\"] { background-color: #F44336; } "
+            "QPushButton[playing=\"true\"]:hover { background-color: #D32F2F; } "
+            "QPushButton:disabled { background-color: #555; color: #888; }"
+        )
 
         self.play_btn = QPushButton("播放")
         self.play_btn.clicked.connect(self._toggle_play)
         self.play_btn.setEnabled(False)
-        self.play_btn.setStyleSheet(self.play_green_style)
+        self.play_btn.setStyleSheet(play_style)
         btn_layout.addWidget(self.play_btn)
 
         self.play_range_btn = QPushButton("区间播放")
         self.play_range_btn.clicked.connect(self._toggle_play_range)
         self.play_range_btn.setEnabled(False)
-        self.play_range_btn.setStyleSheet(self.play_green_style)
+        self.play_range_btn.setStyleSheet(play_style)
         btn_layout.addWidget(self.play_range_btn)
 
         btn_layout.addSpacing(20)
@@ -805,15 +1212,19 @@ class VideoCutWindow(QMainWindow):
         speed_label = QLabel("速度:")
         speed_label.setStyleSheet("font-size: 14px; font-weight: bold;")
         btn_layout.addWidget(speed_label)
-        self.speed_normal_style = "QPushButton { font-size: 14px; padding: 5px 10px; } QPushButton:disabled { background-color: #555; color: #888; }"
-        self.speed_selected_style = "QPushButton { font-size: 14px; padding: 5px 10px; font-weight: bold; color: white; background-color: #1976D2; } QPushButton:disabled { background-color: #555; color: #888; }"
+        # 选中状态由 selected 属性切换，见 _set_selected
+        speed_style = (
+            "QPushButton { font-size: 14px; padding: 5px 10px; } "
+            "QPushButton[selected=\"true\"] { font-weight: bold; color: white; background-color: #1976D2; } "
+            "QPushButton:disabled { background-color: #555; color: #888; }"
+        )
         self.speed_buttons = []
         self.selected_speed_btn = None
         speeds = [("×0.5", 0.5), ("×1", 1.0), ("×2", 2.0), ("×4", 4.0)]
         for name, speed in speeds:
             btn = QPushButton(name)
             btn.setEnabled(False)
-            btn.setStyleSheet(self.speed_normal_style)
+            btn.setStyleSheet(speed_style)
             btn.clicked.connect(lambda checked, s=speed, b=btn: self._set_speed(s, b))
             btn_layout.addWidget(btn)
             self.speed_buttons.append(btn)
@@ -829,13 +1240,16 @@ class VideoCutWindow(QMainWindow):
 
         durations = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60]
         self.duration_buttons = []
-        self.duration_normal_style = "QPushButton { font-size: 14px; } QPushButton:disabled { background-color: #BDBDBD; color: #757575; }"
-        self.duration_selected_style = "QPushButton { font-size: 14px; font-weight: bold; color: white; background-color: #1976D2; }"
+        duration_style = (
+            "QPushButton { font-size: 14px; } "
+            "QPushButton:disabled { background-color: #BDBDBD; color: #757575; } "
+            "QPushButton[selected=\"true\"] { font-weight: bold; color: white; background-color: #1976D2; }"
+        )
         self.selected_duration_btn = None
         for sec in durations:
             btn = QPushButton(f"{sec}秒")
             btn.setEnabled(False)
-            btn.setStyleSheet(self.duration_normal_style)
+            btn.setStyleSheet(duration_style)
             btn.clicked.connect(lambda checked, s=sec, b=btn: self._set_duration(s, b))
             btn.setFixedWidth(55)
             btn.setFixedHeight(30)
@@ -858,19 +1272,15 @@ class VideoCutWindow(QMainWindow):
             ("9:16", 9/16),
         ]
 
-        self.aspect_normal_style = "QPushButton { font-size: 14px; padding: 5px 10px; } QPushButton:disabled { background-color: #555; color: #888; }"
-        self.aspect_selected_style = "QPushButton { font-size: 14px; padding: 5px 10px; font-weight: bold; color: white; background-color: #1976D2; } QPushButton:disabled { background-color: #555; color: #888; }"
         self.aspect_buttons = []
-        self.selected_aspect_btn = None
+        self.selected_aspect_idx = 0  # 当前选中的宽高比在 aspect_ratios 中的下标
         for i, (name, ratio) in enumerate(self.aspect_ratios):
             btn = QPushButton(name)
             btn.setEnabled(False)
-            btn.setStyleSheet(self.aspect_normal_style)
-            btn.clicked.connect(lambda checked, r=ratio, b=btn: self._set_aspect_ratio(r, b))
+            btn.setStyleSheet(speed_style)  # 与速度按钮同一样式
+            btn.clicked.connect(lambda checked, idx=i: self._set_aspect_ratio(idx))
             duration_layout.addWidget(btn)
             self.aspect_buttons.append(btn)
-            if i == 0:
-                self.selected_aspect_btn = btn
 
         duration_layout.addStretch()
 
@@ -894,29 +1304,98 @@ class VideoCutWindow(QMainWindow):
             self._refresh_file_list()
 
     def _refresh_file_list(self):
-        """刷新文件列表"""
-        video_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'}
-
-        # 刷新源视频列表
-        self.file_list.clear()
-        if self.current_folder.exists():
-            files = sorted(self.current_folder.iterdir(), key=lambda x: x.name.lower())
-            for f in files:
-                if f.is_file() and f.suffix.lower() in video_extensions:
-                    item = QListWidgetItem(f.name)
-                    item.setData(Qt.UserRole, str(f))
-                    self.file_list.addItem(item)
-
-        # 刷新生成视频列表（按修改时间从新到旧排序）
-        self.generated_list.clear()
-        if self.generated_folder.exists():
-            files = sorted(self.generated_folder.iterdir(),
-                          key=lambda x: x.stat().st_mtime, reverse=True)
-            for f in files:
-                if f.is_file() and f.suffix.lower() in video_extensions:
-                    item = QListWidgetItem(f.name)
-                    item.setData(Qt.UserRole, str(f))
-                    self.generated_list.addItem(item)
+        """
+        刷新文件列表，分三步避免大目录卡住界面：
+        1. scandir 只取文件名，分批填入列表
+        2. 后台线程读取生成文件的修改时间
+        3. 拿到修改时间后按从新到旧重新填充生成列表
+        目录自身的修改时间未变（没有增删改名）时直接复用上次的结果
+        """
+        self._list_scan_id += 1
+
+        # 刷新源视频列表（按文件名排序）
+        folder = self.current_folder
+        mtime = self._folder_mtime(folder)
+        cached = self._dir_cache.get(folder)
+        if cached and cached[0] == mtime:
+            entries = cached[1]
+        else:
+            entries = []
+            if mtime is not None:
+                entries = [(e.name, e.path) for e in self._scan_videos(folder)]
+                entries.sort(key=lambda t: t[0].lower())
+                self._dir_cache[folder] = (mtime, entries)
+        self._show_list(self.file_list, entries)
+
+        # 刷新生成视频列表，先按文件名占位，修改时间读取后再排序
+        folder = self.generated_folder
+        mtime = self._folder_mtime(folder)
+        cached = self._dir_cache.get(folder)
+        if cached and cached[0] == mtime:
+            self._show_list(self.generated_list, cached[1])
+            return
+        entries = []
+        if mtime is not None:
+            entries = self._scan_videos(folder)
+            entries.sort(key=lambda e: e.name.lower())
+        self._show_list(self.generated_list, [(e.name, e.path) for e in entries])
+        if entries:
+            threading.Thread(
+                target=self._stat_generated, args=(self._list_scan_id, folder, mtime, entries), daemon=True
+            ).start()
+
+    def _folder_mtime(self, folder):
+        """目录的修改时间（纳秒），目录不存在返回 None"""
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _show_list(self, widget, entries):
+        """显示条目列表，与当前显示的是同一份缓存结果时不重新填充（保留选中状态）"""
+        if self._list_shown.get(widget) is entries:
+            return
+        self._list_shown[widget] = entries
+        self._populate_list(widget, entries)
+
+    def _scan_videos(self, folder):
+        """scandir 列出视频文件，直接给出文件名和类型，无需为每项创建 Path 或额外 stat"""
+        with os.scandir(folder) as it:
+            return [e for e in it
+                    if e.is_file() and os.path.splitext(e.name)[1].lower() in VIDEO_EXTENSIONS]
+
+    def _stat_generated(self, scan_id, folder, folder_mtime, entries):
+        """后台线程：读取修改时间并排序，结果经信号回到界面线程"""
+        # DirEntry.stat() 在 Windows 上直接取自目录读取结果
+        stamped = [(e.stat().st_mtime, e.name, e.path) for e in entries]
+        stamped.sort(reverse=True)
+        self.generatedSorted.emit(scan_id, (folder, folder_mtime, [(name, path) for _, name, path in stamped]))
+
+    def _on_generated_sorted(self, scan_id, result):
+        folder, folder_mtime, entries = result
+        self._dir_cache[folder] = (folder_mtime, entries)
+        if scan_id == self._list_scan_id:
+            self._show_list(self.generated_list, entries)
+
+    def _populate_list(self, widget, entries, start=0, token=None):
+        """分批（每批 LIST_BATCH 项）填充列表，批次之间让出事件循环；重新填充时旧批次作废"""
+        if token is None:
+            token = object()
+            self._populate_tokens[widget] = token
+            widget.clear()
+        elif self._populate_tokens.get(widget) is not token:
+            return
+
+        widget.setUpdatesEnabled(False)
+        for name, path in entries[start:start + LIST_BATCH]:
+            item = QListWidgetItem(name)
+            item.setData(Qt.UserRole, path)
+            widget.addItem(item)
+        widget.setUpdatesEnabled(True)
+
+        start += LIST_BATCH
+        if start < len(entries):
+            QTimer.singleShot(0, lambda: self._populate_list(widget, entries, start, token))
 
     def _on_generated_selected(self, item):
         """生成视频列表点击"""
@@ -934,15 +1413,20 @@ class VideoCutWindow(QMainWindow):
                 self._open_in_explorer(path)
 
     def _open_in_explorer(self, file_path):
-        """在文件浏览器中打开文件所在位置"""
-        import subprocess
+        """在文件浏览器中打开文件所在位置（只启动不等待，冷启动资源管理器较慢也不卡界面）"""
         import platform
-        if platform.system() == "Windows":
-            subprocess.run(['explorer', '/select,', file_path])
-        elif platform.system() == "Darwin":  # macOS
-            subprocess.run(['open', '-R', file_path])
+        system = platform.system()
+        if system == "Windows":
+            cmd = ['explorer', '/select,', file_path]
+        elif system == "Darwin":  # macOS
+            cmd = ['open', '-R', file_path]
         else:  # Linux
-            subprocess.run(['xdg-open', str(Path(file_path).parent)])
+            cmd = ['xdg-open', str(Path(file_path).parent)]
+        flags = subprocess.DETACHED_PROCESS if system == "Windows" else 0
+        try:
+            subprocess.Popen(cmd, close_fds=True, creationflags=flags)
+        except OSError:
+            pass
 
     def _on_file_selected(self, item):
         """文件列表点击"""
@@ -957,20 +1441,27 @@ class VideoCutWindow(QMainWindow):
         if self.is_playing:
             self._stop_play()
 
-        if self.cap:
-            self.cap.release()
+        if self.cap_play:
+            self.cap_play.release()
 
-        self.cap = cv2.VideoCapture(path)
-        if not self.cap.isOpened():
+        self.cap_play = cv2.VideoCapture(path)
+        if not self.cap_play.isOpened():
             self.status_label.setText(f"错误: 无法打开视频 {Path(path).name}")
             self.status_label.setStyleSheet("color: #F44336; padding: 5px; border-top: 1px solid #444;")
             return
 
+        # 只需要最新解码的帧，缩小内部缓冲以降低延迟（部分后端不支持）
+        try:
+            self.cap_play.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except cv2.error:
+            pass
+
         self.video_path = path
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
-        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.openRequested.emit(path)
+        self.total_frames = int(self.cap_play.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.cap_play.get(cv2.CAP_PROP_FPS) or 30
+        self.width = int(self.cap_play.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap_play.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
         # 计算视频总时长
         total_seconds = self.total_frames / self.fps
@@ -984,8 +1475,6 @@ class VideoCutWindow(QMainWindow):
         )
         self.file_label.setStyleSheet("color: white;")
 
-        self.range_slider.setRange(0, self.total_frames - 1)
-
         # 启用按钮
         self.set_start_btn.setEnabled(True)
         self.set_end_btn.setEnabled(True)
@@ -1001,18 +1490,15 @@ class VideoCutWindow(QMainWindow):
 
         # 设置视频尺寸
         self.preview_label.setVideoSize(self.width, self.height)
+        self._update_preview_size()
 
-        self._preview_frame(0)
-        self._update_time_labels()
+        # 重置滑块，触发一次预览第0帧并刷新时间标签
+        self.range_slider.setRange(0, self.total_frames - 1)
 
         # 重置裁剪区域（在预览帧之后，确保图片尺寸已更新）
         self.preview_label.resetCrop()
         # 重置宽高比为自由
-        if self.selected_aspect_btn:
-            self.selected_aspect_btn.setStyleSheet(self.aspect_normal_style)
-        self.aspect_buttons[0].setStyleSheet(self.aspect_selected_style)
-        self.selected_aspect_btn = self.aspect_buttons[0]
-        self.preview_label.setAspectRatio(None)
+        self._set_aspect_ratio(0)
 
         self.status_label.setText(f"已加载: {Path(path).name}")
         self.status_label.setStyleSheet("color: #4CAF50; padding: 5px; border-top: 1px solid #444;")
@@ -1025,73 +1511,123 @@ class VideoCutWindow(QMainWindow):
         if path:
             self._load_video(path)
 
+    def _seek(self, frame_idx):
+        seek_capture(self.cap_play, frame_idx)
+
     def _preview_frame(self, frame_idx):
-        if not self.cap:
+        if not self.cap_play:
             return
 
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ret, frame = self.cap.read()
+        pixmap = QPixmapCache.find(self._pixmap_key(frame_idx))
+        if pixmap is not None:
+            self._awaiting_frame = None
+            self.preview_label.setPixmap(pixmap)
+        else:
+            # 未命中缓存，交给解码线程，结果经 _on_frame_ready 回到界面线程
+            self._awaiting_frame = frame_idx
+            size = (self._prev_w, self._prev_h) if self._prev_w > 0 and self._prev_h > 0 else None
+            self.decode_worker.request(frame_idx, size)
+
+    def _on_frame_ready(self, frame_idx, frame):
+        # 解码线程已按预览尺寸缩放；请求发出后预览区域又变了尺寸时才需要再缩放
+        if frame.shape[:2] == (self._prev_h, self._prev_w):
+            resized = frame
+        else:
+            resized = self._resize_preview(frame)
+            if resized is None:
+                return
+        pixmap = self._np_to_qpixmap(resized)
+        QPixmapCache.insert(self._pixmap_key(frame_idx), pixmap)
 
-        if not ret:
+        # 拖动过程中中间帧也显示；已被缓存命中的更新帧取代或正在播放时不显示
+        if self._awaiting_frame is None or self.is_playing:
             return
+        if frame_idx == self._awaiting_frame:
+            self._awaiting_frame = None
+        self.preview_label.setPixmap(pixmap)
+
+    def _pixmap_key(self, frame_idx):
+        """预览缓存键：视频路径、帧号和预览尺寸都参与，换视频或改尺寸后旧条目自然失效"""
+        return f"{self.video_path}:{frame_idx}:{self._prev_w}x{self._prev_h}"
+
+    def _schedule_preview(self, frame_idx):
+        """拖动时合并预览请求：缓存命中立即显示，否则每 30ms 最多解码一次最新的帧"""
+        if QPixmapCache.find(self._pixmap_key(frame_idx)) is not None:
+            self._pending_preview_idx = None
+            self._preview_frame(frame_idx)
+            return
+        self._pending_preview_idx = frame_idx
+        if not self._preview_debounce.isActive():
+            self._preview_debounce.start()
 
-        h, w = frame.shape[:2]
-        max_h = self.preview_label.height() - 10
-        max_w = self.preview_label.width() - 10
-
-        scale = min(max_w / w, max_h / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-
-        if new_w > 0 and new_h > 0:
-            resized = cv2.resize(frame, (new_w, new_h))
-            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-            qimg = QImage(rgb.data, new_w, new_h, new_w * 3, QImage.Format_RGB888)
-            self.preview_label.setPixmap(QPixmap.fromImage(qimg))
+    def _do_pending_preview(self):
+        if self._pending_preview_idx is not None:
+            frame_idx, self._pending_preview_idx = self._pending_preview_idx, None
+            self._preview_frame(frame_idx)
 
     def _on_start_changed(self, val):
-        self._preview_frame(val)
+        self._jump_playback(val)
+        self._schedule_preview(val)
         self._update_time_labels()
         self._reset_duration_selection()
 
     def _on_end_changed(self, val):
-        self._preview_frame(val)
+        self._jump_playback(val)
+        self._schedule_preview(val)
         self._update_time_labels()
         self._reset_duration_selection()
 
     def _on_preview_changed(self, val):
-        self._preview_frame(val)
+        self._jump_playback(val)
+        self._schedule_preview(val)
         self._update_time_labels()
 
+    def _jump_playback(self, frame_idx):
+        """播放中拖动滑块时从该帧继续播放：播放用的 cap_play、预览位置和播放时钟一起重置"""
+        if not self.is_playing:
+            return
+        self.range_slider._preview = frame_idx
+        self.range_slider.update()
+        self._seek(frame_idx)
+        self._update_play_interval()
+
     def _on_crop_changed(self, crop):
         x, y, w, h = crop
         self.crop_info_label.setText(
             f"裁剪: X={x*100:.0f}% Y={y*100:.0f}% W={w*100:.0f}% H={h*100:.0f}%"
         )
 
-    def _set_aspect_ratio(self, ratio, btn=None):
-        """设置宽高比"""
-        self.preview_label.setAspectRatio(ratio)
+    @staticmethod
+    def _set_style_flag(widget, name, value):
+        """切换样式表属性选择器用到的动态属性，只重新套用样式，不重新解析样式表"""
+        widget.setProperty(name, value)
+        style = widget.style()
+        style.unpolish(widget)
+        style.polish(widget)
+
+    def _set_selected(self, btn, selected):
+        self._set_style_flag(btn, 'selected', selected)
+
+    def _set_aspect_ratio(self, idx):
+        """设置宽高比，idx 为 aspect_ratios 中的下标"""
+        self.preview_label.setAspectRatio(self.aspect_ratios[idx][1])
         # 更新按钮样式
-        if btn:
-            if self.selected_aspect_btn:
-                self.selected_aspect_btn.setStyleSheet(self.aspect_normal_style)
-            btn.setStyleSheet(self.aspect_selected_style)
-            self.selected_aspect_btn = btn
+        self._set_selected(self.aspect_buttons[self.selected_aspect_idx], False)
+        self._set_selected(self.aspect_buttons[idx], True)
+        self.selected_aspect_idx = idx
 
     def _reset_crop(self):
         """重置裁剪区域"""
         self.preview_label.resetCrop()
         # 重新应用当前宽高比
-        if self.selected_aspect_btn:
-            idx = self.aspect_buttons.index(self.selected_aspect_btn)
-            current_ratio = self.aspect_ratios[idx][1]
-            if current_ratio is not None:
-                self.preview_label.setAspectRatio(current_ratio)
+        current_ratio = self.aspect_ratios[self.selected_aspect_idx][1]
+        if current_ratio is not None:
+            self.preview_label.setAspectRatio(current_ratio)
 
     def _reset_duration_selection(self):
         """重置时长按钮选中状态"""
         if self.selected_duration_btn:
-            self.selected_duration_btn.setStyleSheet(self.duration_normal_style)
+            self._set_selected(self.selected_duration_btn, False)
             self.selected_duration_btn = None
 
     def _set_preview_as_start(self):
@@ -1120,32 +1656,32 @@ class VideoCutWindow(QMainWindow):
         # 更新按钮样式
         if btn:
             if self.selected_duration_btn:
-                self.selected_duration_btn.setStyleSheet(self.duration_normal_style)
-            btn.setStyleSheet(self.duration_selected_style)
+                self._set_selected(self.selected_duration_btn, False)
+            self._set_selected(btn, True)
             self.selected_duration_btn = btn
 
     def _toggle_play(self):
         """切换播放/暂停"""
-        if not self.cap:
+        if not self.cap_play:
             return
         if self.is_playing:
             self._stop_play()
         else:
             self.play_range_only = False
             # 定位到当前预览位置
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.range_slider.preview())
+            self._seek(self.range_slider.preview())
             self._start_play()
 
     def _toggle_play_range(self):
         """切换播放区间/暂停"""
-        if not self.cap:
+        if not self.cap_play:
             return
         if self.is_playing:
             self._stop_play()
         else:
             self.play_range_only = True
             # 定位到起点
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.range_slider.start())
+            self._seek(self.range_slider.start())
             self.range_slider._preview = self.range_slider.start()
             self._start_play()
 
@@ -1153,35 +1689,33 @@ class VideoCutWindow(QMainWindow):
         """开始播放"""
         self.is_playing = True
         self.play_btn.setText("暂停")
-        self.play_btn.setStyleSheet(self.play_red_style)
+        self._set_style_flag(self.play_btn, 'playing', True)
         self.play_range_btn.setText("停止")
-        self.play_range_btn.setStyleSheet(self.play_red_style)
+        self._set_style_flag(self.play_range_btn, 'playing', True)
         self._update_play_interval()
 
     def _update_play_interval(self):
-        """更新播放定时器间隔和跳帧数"""
-        # 初始跳帧数 = 播放速度
+        """重置播放时钟：以当前位置为起点，按 fps*速度 计算每帧的截止时间"""
+        # 最小步进帧数 = 播放速度，高倍速时显示帧率不超过视频帧率
         if self.play_speed >= 2:
             self.frame_skip = int(self.play_speed)
         else:
             self.frame_skip = 1  # 0.5x和1x每帧都显示
 
-        # 重置时间记录
-        self.last_play_time = time.time()
-
-        # 计算定时器间隔（考虑跳帧后的实际帧率）
-        effective_fps = (self.fps * self.play_speed) / self.frame_skip
-        interval = int(1000 / effective_fps)
-        self.play_timer.start(max(10, interval))  # 最小10ms
+        # 每帧时长预先算成整数纳秒，定时器回调里只做整数运算
+        self.frame_interval_ns = int(1_000_000_000 / (self.fps * self.play_speed))
+        self.play_origin_frame = self.range_slider._preview
+        self.play_clock.start()
+        self.play_timer.start(0)
 
     def _stop_play(self):
         """停止播放"""
         self.play_timer.stop()
         self.is_playing = False
         self.play_btn.setText("播放")
-        self.play_btn.setStyleSheet(self.play_green_style)
+        self._set_style_flag(self.play_btn, 'playing', False)
         self.play_range_btn.setText("区间播放")
-        self.play_range_btn.setStyleSheet(self.play_green_style)
+        self._set_style_flag(self.play_range_btn, 'playing', False)
 
     def _set_speed(self, speed, btn=None):
         """设置播放速度"""
@@ -1191,78 +1725,94 @@ class VideoCutWindow(QMainWindow):
         # 更新按钮样式
         if btn:
             if self.selected_speed_btn:
-                self.selected_speed_btn.setStyleSheet(self.speed_normal_style)
-            btn.setStyleSheet(self.speed_selected_style)
+                self._set_selected(self.selected_speed_btn, False)
+            self._set_selected(btn, True)
             self.selected_speed_btn = btn
 
     def _on_play_timer(self):
-        """播放定时器回调 - 顺序读取帧，支持动态跳帧加速"""
+        """播放定时器回调 - 按已用时间算出应显示的帧，解码跟不上时自动多跳帧"""
         current = self.range_slider._preview
-        now = time.time()
-
-        # 动态调整跳帧数（仅4x速度）
-        if self.play_speed >= 4 and self.last_play_time > 0:
-            actual_interval = now - self.last_play_time
-            # 期望间隔：跳过frame_skip帧应该花费的真实时间
-            expected_interval = self.frame_skip / (self.fps * self.play_speed)
+        # 区间播放模式到达终点后停止，普通模式播到最后一帧
+        end = self.range_slider.end() if self.play_range_only else self.total_frames - 1
+        if current >= end:
+            self._stop_play()
+            return
 
-            # 如果实际时间超过期望的1.2倍，说明跟不上，增加跳帧数
-            if actual_interval > expected_interval * 1.2:
-                # 根据延迟比例增加跳帧，最大不超过speed*2
-                self.frame_skip = min(int(self.frame_skip * 1.5), int(self.play_speed * 2))
+        target = self.play_origin_frame + self.play_clock.nsecsElapsed() // self.frame_interval_ns
 
-        self.last_play_time = now
+        if target >= current + self.frame_skip:
+            target = min(target, end)
 
-        if self.play_range_only:
-            # 区间播放模式 - 到达终点后停止
-            if current >= self.range_slider.end():
-                self._stop_play()
-                return
-        else:
-            # 普通播放模式
-            if current >= self.total_frames - 1:
-                self._stop_play()
-                return
+            # 中间帧只grab不解码，只解码显示最后一帧
+            for _ in range(target - current):
+                if not self.cap_play.grab():
+                    self._stop_play()
+                    return
 
-        # 根据 frame_skip 跳帧读取，只显示最后一帧
-        frame = None
-        for i in range(self.frame_skip):
-            ret, frame = self.cap.read()
+            ret, frame = self.cap_play.retrieve()
             if not ret:
                 self._stop_play()
                 return
-            current += 1
+            current = target
 
-            # 检查边界
-            if self.play_range_only:
-                if current >= self.range_slider.end():
-                    break
-            else:
-                if current >= self.total_frames - 1:
-                    break
+            # 更新预览位置
+            self.range_slider._preview = current
+            self.range_slider.update()
+            self._update_time_labels()
 
-        # 更新预览位置
-        self.range_slider._preview = current
-        self.range_slider.update()
-        self._update_time_labels()
+            # 显示帧
+            self._display_frame(frame)
 
-        # 显示帧
-        self._display_frame(frame)
+        # 下一次在第 current+frame_skip 帧的截止时间触发
+        due_ns = (current + self.frame_skip - self.play_origin_frame) * self.frame_interval_ns
+        self.play_timer.start(max(1, (due_ns - self.play_clock.nsecsElapsed()) // 1_000_000))
 
-    def _display_frame(self, frame):
-        """显示帧到预览区域"""
-        h, w = frame.shape[:2]
+    def _update_preview_size(self):
+        """按预览区域尺寸计算显示分辨率，视频加载和预览区域缩放时更新"""
+        if not self.width or not self.height:
+            return
         max_h = self.preview_label.height() - 10
         max_w = self.preview_label.width() - 10
 
-        scale = min(max_w / w, max_h / h)
-        new_w, new_h = int(w * scale), int(h * scale)
+        scale = min(max_w / self.width, max_h / self.height)
+        size = (int(self.width * scale), int(self.height * scale))
+        self._prev_w, self._prev_h = size
+        # 缩小时用 INTER_AREA，画质好且只需读一遍源像素；放大时仍用双线性
+        self._prev_interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+
+    def _resize_preview(self, frame, interp=None, dst=None):
+        """把帧缩放到预览尺寸，预览区域尚无有效尺寸时返回 None"""
+        if self._prev_w <= 0 or self._prev_h <= 0:
+            return None
+        if interp is None:
+            interp = self._prev_interp
+        return cv2.resize(frame, (self._prev_w, self._prev_h), dst=dst, interpolation=interp)
 
-        if new_w > 0 and new_h > 0:
-            resized = cv2.resize(frame, (new_w, new_h))
-            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-            qimg = QImage(rgb.data, new_w, new_h, new_w * 3, QImage.Format_RGB888)
-            self.preview_label.setPixmap(QPixmap.fromImage(qimg))
+    def _display_frame(self, frame):
+        """显示帧到预览区域，播放中画面一闪而过，用最快的最近邻插值"""
+        interp = cv2.INTER_NEAREST if self.is_playing else None
+        # 播放路径复用同一块缩放缓冲（QPixmap.fromImage 已拷贝，下一帧可直接覆盖）
+        if self._resize_buf is None or self._resize_buf.shape[:2] != (self._prev_h, self._prev_w):
+            self._resize_buf = np.empty((max(self._prev_h, 1), max(self._prev_w, 1), 3), dtype=np.uint8)
+        resized = self._resize_preview(frame, interp, self._resize_buf)
+        if resized is not None:
+            self.preview_label.setPixmap(self._np_to_qpixmap(resized))
+
+    def _np_to_qpixmap(self, frame):
+        """numpy帧直接包装成QImage（不拷贝、不转色彩），再转QPixmap"""
+        h, w = frame.shape[:2]
+        if HAS_BGR888:
+            frame = np.ascontiguousarray(frame)
+            fmt = QImage.Format_BGR888
+        else:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            fmt = QImage.Format_RGB888
+        # QImage 只引用 numpy 内存，转换期间保持引用；直接传指针，不经过缓冲区协议
+        self._frame_ref = frame
+        ptr = sip.voidptr(frame.ctypes.data)
+        ptr.setsize(frame.nbytes)
+        qimg = QImage(ptr, w, h, frame.strides[0], fmt)
+        return QPixmap.fromImage(qimg)
 
     def _update_time_labels(self):
         start_frame = self.range_slider.start()
@@ -1284,7 +1834,7 @@ class VideoCutWindow(QMainWindow):
         return f"{h:02d}:{m:02d}:{s:02d}"
 
     def _export_clip(self):
-        if not self.cap or not self.video_path:
+        if not self.cap_play or not self.video_path:
             return
 
         start_frame = self.range_slider.start()
@@ -1315,6 +1865,13 @@ class VideoCutWindow(QMainWindow):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         save_path = str(self.generated_folder / f"{timestamp}_{duration_sec}秒.mp4")
 
+        # 不裁剪时直接用 ffmpeg 复制码流，不重新编码
+        if (crop_x, crop_y, crop_w, crop_h) == (0, 0, 1, 1) and shutil.which('ffmpeg'):
+            result = self._export_stream_copy(start_frame, total, save_path)
+            if result is not False:
+                self._finish_export(result is None, save_path, total, self.width, self.height)
+                return
+
         # 创建进度对话框（模态，阻止其他操作）
         progress = QProgressDialog("正在导出视频...", "停止", 0, total, self)
         progress.setWindowTitle("导出中")
@@ -1323,44 +1880,58 @@ class VideoCutWindow(QMainWindow):
         progress.setValue(0)
         progress.show()
 
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        writer = cv2.VideoWriter(save_path, fourcc, self.fps, (cw, ch))
-
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-
-        canceled = False
-        for i in range(total):
-            if progress.wasCanceled():
-                canceled = True
-                break
-
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-
-            # 裁剪
-            cropped = frame[cy:cy+ch, cx:cx+cw]
-            writer.write(cropped)
-
-            # 更新进度
-            progress.setValue(i + 1)
-            progress.setLabelText(f"正在导出... {(i+1)/total*100:.0f}%\n{i+1}/{total} 帧")
-            QApplication.processEvents()
-
-        writer.release()
-        progress.close()
-
-        if canceled:
+        # 裁剪和编码放到后台线程，界面线程只接收进度信号
+        worker = ExportWorker(self.video_path, save_path, start_frame, total, self.fps, (cx, cy, cw, ch))
+        thread = QThread()
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_export_progress)
+        worker.finished.connect(
+            lambda canceled, error: self._on_export_finished(canceled, error, save_path, total, cw, ch)
+        )
+        # worker 线程正忙于 run()，取消请求必须直接调用
+        progress.canceled.connect(worker.cancel, Qt.DirectConnection)
+
+        self.export_progress = progress
+        self.export_worker = worker
+        self.export_thread = thread
+        thread.start()
+
+    def _on_export_progress(self, done, total):
+        # 模态进度框的 setValue 内部会处理事件，可能先处理掉 finished 信号
+        progress = self.export_progress
+        if progress is None:
+            return
+        progress.setLabelText(f"正在导出... {done/total*100:.0f}%\n{done}/{total} 帧")
+        progress.setValue(done)
+
+    def _on_export_finished(self, canceled, error, save_path, total, cw, ch):
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_progress.close()
+        self.export_thread = None
+        self.export_worker = None
+        self.export_progress = None
+        self._finish_export(canceled, save_path, total, cw, ch, error)
+
+    def _finish_export(self, canceled, save_path, total, cw, ch, error=""):
+        """导出结束后的清理和状态显示，error 非空表示导出失败"""
+        if canceled or error:
             # 删除未完成的文件
             try:
                 Path(save_path).unlink()
             except:
                 pass
-            self.status_label.setText("导出已取消")
-            self.status_label.setStyleSheet("color: #FFC107; padding: 5px; border-top: 1px solid #444;")
+            if error:
+                self.status_label.setText(f"导出失败: {error}")
+                self.status_label.setStyleSheet("color: #F44336; padding: 5px; border-top: 1px solid #444;")
+            else:
+                self.status_label.setText("导出已取消")
+                self.status_label.setStyleSheet("color: #FFC107; padding: 5px; border-top: 1px solid #444;")
             return
 
-        # 刷新文件列表
+        # 刷新文件列表（文件系统时间戳精度可能不足以体现新文件，显式作废缓存）
+        self._dir_cache.pop(self.generated_folder, None)
         self._refresh_file_list()
 
         # 显示完成信息
@@ -1371,15 +1942,91 @@ class VideoCutWindow(QMainWindow):
         )
         self.status_label.setStyleSheet("color: #4CAF50; padding: 5px; border-top: 1px solid #444;")
 
+    def _export_stream_copy(self, start_frame, total, save_path):
+        """
+        用 ffmpeg -c copy 导出选中时间段（不解码、不编码）
+        返回 True 成功，False 失败（调用方改走重新编码），None 用户取消
+        注意：复制码流只能从关键帧开始，起点可能比所选帧略早
+        """
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error', '-nostats', '-progress', 'pipe:1',
+            '-ss', f"{start_frame / self.fps:.3f}", '-i', self.video_path,
+            '-t', f"{total / self.fps:.3f}", '-c', 'copy', '-avoid_negative_ts', 'make_zero',
+            save_path,
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                universal_newlines=True)
+
+        # -progress 输出 key=value 行，后台线程只记录最新的 out_time_us
+        out_time_us = [0]
+
+        def read_progress():
+            for line in proc.stdout:
+                key, _, value = line.strip().partition('=')
+                if key == 'out_time_us' and value.isdigit():
+                    out_time_us[0] = int(value)
+
+        progress_reader = threading.Thread(target=read_progress, daemon=True)
+        progress_reader.start()
+
+        progress = QProgressDialog("正在导出视频（复制码流）...", "停止", 0, total, self)
+        progress.setWindowTitle("导出中")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.show()
+
+        # 局部事件循环等待 ffmpeg 结束，定时轮询进度，界面照常响应
+        loop = QEventLoop()
+        canceled = [False]
+
+        def poll():
+            if proc.poll() is not None:
+                loop.quit()
+                return
+            done = min(int(out_time_us[0] / 1e6 * self.fps), total)
+            progress.setLabelText(f"正在导出（复制码流）... {done/total*100:.0f}%\n{done}/{total} 帧")
+            progress.setValue(done)
+
+        def cancel():
+            canceled[0] = True
+            proc.kill()
+            loop.quit()
+
+        poll_timer = QTimer()
+        poll_timer.timeout.connect(poll)
+        progress.canceled.connect(cancel)
+        poll_timer.start(50)
+        loop.exec_()
+        poll_timer.stop()
+        # closeEvent 也会发出 canceled，关闭对话框前先断开
+        progress.canceled.disconnect(cancel)
+
+        proc.wait()
+        progress_reader.join()
+        progress.close()
+        if canceled[0]:
+            return None
+        return proc.returncode == 0
+
     def closeEvent(self, event):
         if self.is_playing:
             self._stop_play()
-        if self.cap:
-            self.cap.release()
+        if self.cap_play:
+            self.cap_play.release()
+        if self.export_thread:
+            self.export_worker.cancel()
+            self.export_thread.quit()
+            self.export_thread.wait()
+        QMetaObject.invokeMethod(self.decode_worker, "close", Qt.BlockingQueuedConnection)
+        self.decode_thread.quit()
+        self.decode_thread.wait()
         event.accept()
 
 
 def main():
+    # 预先触发 JIT 编译，避免第一次拖动裁剪框时卡顿
+    _clamp_aspect(0.0, 0.0, 0.5, 0.5, 1.0, 0.05, ANCHOR_TOP)
+
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
 
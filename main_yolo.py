@@ -5,6 +5,7 @@
 
 import sys
 import os
+import time
 from pathlib import Path
 
 from PyQt5.QtWidgets import (
@@ -12,7 +13,7 @@ from PyQt5.QtWidgets import (
     QPushButton, QLabel, QFileDialog, QProgressBar, QSpinBox,
     QGroupBox, QComboBox, QCheckBox, QMessageBox, QFrame
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal, QMutex, QMutexLocker
 from PyQt5.QtGui import QImage, QPixmap
 
 import cv2
@@ -22,21 +23,38 @@ from yolo_detector import YOLODetector
 from tracker import TrackerType
 from video_processor import VideoProcessor
 
+# QImage.Format_BGR888 需要 Qt 5.14+，更早的版本退回 cvtColor + RGB888
+HAS_BGR888 = hasattr(QImage, 'Format_BGR888')
+PREVIEW_FORMAT = QImage.Format_BGR888 if HAS_BGR888 else QImage.Format_RGB888
+
 
 class ProcessingThread(QThread):
     """视频处理线程"""
     progress = pyqtSignal(int, int, dict)  # current, total, stats
-    frame_ready = pyqtSignal(np.ndarray)   # 预览帧
     finished = pyqtSignal(dict)            # 完成信号
     error = pyqtSignal(str)                # 错误信号
 
+    PREVIEW_INTERVAL = 1 / 30  # 预览最高 30 帧/秒，界面用 take_preview 定时取
+
     def __init__(self, processor: VideoProcessor, input_path: str,
-                 output_path: str, skip_frames: int):
+                 output_path: str, skip_frames: int, preview: bool = True):
         super().__init__()
         self.processor = processor
         self.input_path = input_path
         self.output_path = output_path
         self.skip_frames = skip_frames
+        self.preview = preview
+
+        # 预览双缓冲：处理线程写后台缓冲，写完在锁内与前台交换；界面只在锁内读前台缓冲
+        # 界面来不及显示的旧帧直接被覆盖，内存固定为两帧
+        self.preview_height = 360
+        self._preview_mutex = QMutex()
+        self._preview_bufs = [None, None]
+        self._front = 0
+        self._preview_seq = 0  # 每发布一帧加1
+        self._taken_seq = 0    # 界面已取走的序号
+        self._last_preview_time = 0.0
+        self._resize_buf = None  # 需要转色时复用的缩放缓冲，尺寸变化时才重新分配
 
     def run(self):
         try:
@@ -44,7 +62,7 @@ class ProcessingThread(QThread):
                 input_path=self.input_path,
                 output_path=self.output_path,
                 progress_callback=self._on_progress,
-                preview_callback=self._on_frame,
+                preview_callback=self._on_frame if self.preview else None,
                 skip_frames=self.skip_frames
             )
             self.finished.emit(stats)
@@ -54,8 +72,51 @@ class ProcessingThread(QThread):
     def _on_progress(self, current, total, stats):
         self.progress.emit(current, total, stats)
 
+    def set_preview_height(self, height: int):
+        """设置预览高度（界面线程调用）"""
+        self.preview_height = max(1, height)
+
     def _on_frame(self, frame):
-        self.frame_ready.emit(frame)
+        """在处理线程中缩放（必要时转色）到自己的缓冲，界面线程只负责显示；frame 是只读视图，不保留引用"""
+        now = time.perf_counter()
+        if now - self._last_preview_time < self.PREVIEW_INTERVAL:
+            return
+        self._last_preview_time = now
+
+        h, w = frame.shape[:2]
+        scale = self.preview_height / h
+        new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+
+        # 写入后台缓冲（界面不会读它），不持锁
+        back = self._front ^ 1
+        buf = self._preview_bufs[back]
+        if buf is None or buf.shape[:2] != (new_h, new_w):
+            buf = self._preview_bufs[back] = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        if HAS_BGR888:
+            # 界面直接显示 BGR，缩放结果就是预览帧
+            cv2.resize(frame, (new_w, new_h), dst=buf)
+        else:
+            if self._resize_buf is None or self._resize_buf.shape[:2] != (new_h, new_w):
+                self._resize_buf = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            cv2.resize(frame, (new_w, new_h), dst=self._resize_buf)
+            cv2.cvtColor(self._resize_buf, cv2.COLOR_BGR2RGB, dst=buf)
+
+        # 发布：前后台交换，界面还没取走的上一帧被覆盖
+        with QMutexLocker(self._preview_mutex):
+            self._front = back
+            self._preview_seq += 1
+
+    def take_preview(self):
+        """取走最新的预览帧（界面线程调用），没有新帧时返回 None"""
+        with QMutexLocker(self._preview_mutex):
+            if self._preview_seq == self._taken_seq:
+                return None
+            self._taken_seq = self._preview_seq
+            # 持锁期间前台缓冲不会被交换，QPixmap 转换完成后才释放
+            buf = self._preview_bufs[self._front]
+            h, w, ch = buf.shape
+            qimg = QImage(buf.data, w, h, w * ch, PREVIEW_FORMAT)
+            return QPixmap.fromImage(qimg)
 
     def stop(self):
         self.processor.stop()
@@ -76,6 +137,11 @@ class MainWindow(QMainWindow):
         self.processor = None
         self.processing_thread = None
 
+        # 预览定时从处理线程取最新帧，界面卡顿时也不会积压
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setInterval(33)
+        self.preview_timer.timeout.connect(self._drain_preview)
+
         self._setup_ui()
 
     def _setup_ui(self):
@@ -118,8 +184,13 @@ class MainWindow(QMainWindow):
         tracker_layout = QVBoxLayout()
         tracker_layout.addWidget(QLabel("跟踪器类型:"))
         self.tracker_combo = QComboBox()
-        self.tracker_combo.addItems(["CSRT (推荐)", "KCF (快速)", "MOSSE (最快)"])
+        self.tracker_combo.addItems(["MOSSE (推荐, 最快)", "KCF (快速)", "CSRT (精确)"])
+        self.tracker_combo.setToolTip("MOSSE 只负责帧间跟踪，靠YOLO重检纠偏（重检间隔最多10帧）")
         tracker_layout.addWidget(self.tracker_combo)
+        self.quality_check = QCheckBox("质量优先")
+        self.quality_check.setToolTip("离线处理用：CSRT跟踪 + 60帧重检间隔，更准但更慢")
+        self.quality_check.toggled.connect(self._on_quality_toggled)
+        tracker_layout.addWidget(self.quality_check)
         params_layout.addLayout(tracker_layout)
 
         # 重新检测间隔
@@ -132,6 +203,16 @@ class MainWindow(QMainWindow):
         redetect_layout.addWidget(self.redetect_spin)
         params_layout.addLayout(redetect_layout)
 
+        # 批量检测
+        batch_layout = QVBoxLayout()
+        batch_layout.addWidget(QLabel("YOLO批量(帧):"))
+        self.batch_spin = QSpinBox()
+        self.batch_spin.setRange(1, 8)
+        self.batch_spin.setValue(1)
+        self.batch_spin.setToolTip("每次推理检测的关键帧数，大于1时需预读更多帧，占用更多内存")
+        batch_layout.addWidget(self.batch_spin)
+        params_layout.addLayout(batch_layout)
+
         # 跳帧设置
         skip_layout = QVBoxLayout()
         skip_layout.addWidget(QLabel("跳帧数(省CPU):"))
@@ -142,6 +223,16 @@ class MainWindow(QMainWindow):
         skip_layout.addWidget(self.skip_spin)
         params_layout.addLayout(skip_layout)
 
+        # OpenCV 线程数
+        threads_layout = QVBoxLayout()
+        threads_layout.addWidget(QLabel("OpenCV线程数:"))
+        self.threads_spin = QSpinBox()
+        self.threads_spin.setRange(1, os.cpu_count() or 1)
+        self.threads_spin.setValue(max(1, (os.cpu_count() or 1) // 2))
+        self.threads_spin.setToolTip("OpenCV 内部并行的线程数，与跟踪线程池叠加时过多反而变慢")
+        threads_layout.addWidget(self.threads_spin)
+        params_layout.addLayout(threads_layout)
+
         # 预览开关
         preview_layout = QVBoxLayout()
         preview_layout.addWidget(QLabel("实时预览:"))
@@ -247,7 +338,15 @@ class MainWindow(QMainWindow):
     def _get_tracker_type(self) -> TrackerType:
         """获取选择的跟踪器类型"""
         idx = self.tracker_combo.currentIndex()
-        return [TrackerType.CSRT, TrackerType.KCF, TrackerType.MOSSE][idx]
+        return [TrackerType.MOSSE, TrackerType.KCF, TrackerType.CSRT][idx]
+
+    def _on_quality_toggled(self, checked: bool):
+        """质量优先模式固定使用 CSRT + 60帧间隔"""
+        self.tracker_combo.setEnabled(not checked)
+        self.redetect_spin.setEnabled(not checked)
+        if checked:
+            self.tracker_combo.setCurrentIndex(2)
+            self.redetect_spin.setValue(60)
 
     def _start_processing(self):
         """开始处理"""
@@ -262,11 +361,15 @@ class MainWindow(QMainWindow):
             QApplication.processEvents()
             self.detector = YOLODetector()
 
+        # 限制 OpenCV 内部线程，避免和跟踪线程池争抢CPU
+        cv2.setNumThreads(self.threads_spin.value())
+
         # 创建处理器
         self.processor = VideoProcessor(
             detector=self.detector,
             tracker_type=self._get_tracker_type(),
-            redetect_interval=self.redetect_spin.value()
+            redetect_interval=self.redetect_spin.value(),
+            yolo_batch=self.batch_spin.value()
         )
 
         # 创建处理线程
@@ -274,16 +377,18 @@ class MainWindow(QMainWindow):
             processor=self.processor,
             input_path=self.input_path,
             output_path=self.output_path,
-            skip_frames=self.skip_spin.value()
+            skip_frames=self.skip_spin.value(),
+            preview=self.preview_check.isChecked()
         )
+        self.processing_thread.set_preview_height(self.preview_label.height() - 10)
 
         self.processing_thread.progress.connect(self._on_progress)
-        if self.preview_check.isChecked():
-            self.processing_thread.frame_ready.connect(self._on_frame)
         self.processing_thread.finished.connect(self._on_finished)
         self.processing_thread.error.connect(self._on_error)
 
         self.processing_thread.start()
+        if self.preview_check.isChecked():
+            self.preview_timer.start()
 
     def _stop_processing(self):
         """停止处理"""
@@ -304,23 +409,16 @@ class MainWindow(QMainWindow):
             f"累计人数: {stats.get('total_persons', 0)}"
         )
 
-    def _on_frame(self, frame: np.ndarray):
-        """预览帧更新"""
-        # 缩放预览
-        h, w = frame.shape[:2]
-        max_h = self.preview_label.height() - 10
-        scale = max_h / h
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(frame, (new_w, new_h))
-
-        # 转换为QImage
-        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        qimg = QImage(rgb.data, w, h, w * ch, QImage.Format_RGB888)
-        self.preview_label.setPixmap(QPixmap.fromImage(qimg))
+    def _drain_preview(self):
+        """预览帧更新（缩放和转色已在处理线程完成）"""
+        pixmap = self.processing_thread.take_preview() if self.processing_thread else None
+        if pixmap is not None:
+            self.preview_label.setPixmap(pixmap)
 
     def _on_finished(self, stats: dict):
         """处理完成"""
+        self.preview_timer.stop()
+        self._drain_preview()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setValue(100)
@@ -338,10 +436,16 @@ class MainWindow(QMainWindow):
 
     def _on_error(self, error: str):
         """处理错误"""
+        self.preview_timer.stop()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         QMessageBox.critical(self, "错误", f"处理出错:\n{error}")
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.processing_thread:
+            self.processing_thread.set_preview_height(self.preview_label.height() - 10)
+
     def closeEvent(self, event):
         """窗口关闭时停止处理"""
         if self.processing_thread and self.processing_thread.isRunning():
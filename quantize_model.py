@@ -0,0 +1,116 @@
+"""
+将 YOLOv8n ONNX 模型静态量化为 INT8 (需要安装 onnxruntime) 或转换为 FP16 (需要 onnxconverter-common)
+
+用法:
+    python quantize_model.py <校准图片文件夹或视频> [样本数]
+    python quantize_model.py --fp16
+
+生成的 models/yolov8n_int8.onnx 会被 YOLODetector 的 ORT 后端自动优先使用；
+models/yolov8n_fp16.onnx 在 OpenCV DNN 选中 CUDA FP16 目标时使用。
+"""
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnx
+from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                      quantize_static)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from yolo_detector import YOLODetector, letterbox_into
+
+MODEL_DIR = Path(__file__).parent / "models"
+INPUT_SIZE = 640
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def iter_frames(source: Path, count: int):
+    """从图片文件夹或视频中均匀取 count 帧 (BGR)"""
+    if source.is_dir():
+        files = sorted(p for p in source.iterdir() if p.suffix.lower() in IMAGE_EXTS)
+        step = max(1, len(files) // count)
+        for path in files[::step][:count]:
+            image = cv2.imread(str(path))
+            if image is not None:
+                yield image
+        return
+
+    cap = cv2.VideoCapture(str(source))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total // count)
+    for i in range(count):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i * step)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+    cap.release()
+
+
+class YoloCalibrationReader(CalibrationDataReader):
+    """按检测器相同的 letterbox 预处理逐张提供校准输入"""
+
+    def __init__(self, input_name: str, source: Path, count: int):
+        self.input_name = input_name
+        self.frames = iter_frames(source, count)
+
+    def get_next(self):
+        image = next(self.frames, None)
+        if image is None:
+            return None
+        blob = np.empty((1, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        letterbox_into(image, blob[0])
+        return {self.input_name: blob}
+
+
+def convert_fp16(fp32_path: Path):
+    """权重和中间计算转为 FP16，输入输出保持 FP32，预处理和后处理不用改"""
+    from onnxconverter_common import float16
+
+    fp16_path = MODEL_DIR / YOLODetector.FP16_MODEL_NAME
+    model = float16.convert_float_to_float16(onnx.load(str(fp32_path)), keep_io_types=True)
+    onnx.save(model, str(fp16_path))
+    print(f"完成: {fp16_path}")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    fp32_path = MODEL_DIR / YOLODetector.MODEL_NAME
+    prep_path = MODEL_DIR / "yolov8n_prep.onnx"
+    int8_path = MODEL_DIR / YOLODetector.INT8_MODEL_NAME
+    if not fp32_path.exists():
+        print(f"模型文件不存在: {fp32_path}，请先运行 download_model.py")
+        sys.exit(1)
+
+    if sys.argv[1] == "--fp16":
+        convert_fp16(fp32_path)
+        return
+
+    source = Path(sys.argv[1])
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    # 量化前先做形状推断和图优化，量化效果更稳定
+    print("预处理模型...")
+    quant_pre_process(str(fp32_path), str(prep_path), skip_symbolic_shape=True)
+
+    input_name = onnx.load(str(prep_path)).graph.input[0].name
+
+    print(f"使用 {count} 帧校准并量化...")
+    quantize_static(
+        str(prep_path), str(int8_path),
+        YoloCalibrationReader(input_name, source, count),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    prep_path.unlink(missing_ok=True)
+    print(f"完成: {int8_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@ import cv2
 import numpy as np
 from pathlib import Path
 
+from yolo_detector import letterbox_into
+
+INPUT_SIZE = 640
+
+
 def test_with_image(image_path=None):
     """用图片测试检测器"""
 
@@ -33,18 +38,8 @@ def test_with_image(image_path=None):
     print(f"图像尺寸: {image.shape}")
 
     # 预处理
-    input_size = 640
-    h, w = image.shape[:2]
-    scale = min(input_size / w, input_size / h)
-    new_w, new_h = int(w * scale), int(h * scale)
-    resized = cv2.resize(image, (new_w, new_h))
-
-    pad_w = (input_size - new_w) // 2
-    pad_h = (input_size - new_h) // 2
-    padded = np.full((input_size, input_size, 3), 114, dtype=np.uint8)
-    padded[pad_h:pad_h+new_h, pad_w:pad_w+new_w] = resized
-
-    blob = cv2.dnn.blobFromImage(padded, 1/255.0, (input_size, input_size), swapRB=True, crop=False)
+    blob = np.empty((1, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    letterbox_into(image, blob[0])
     print(f"Blob shape: {blob.shape}")
 
     # 推理
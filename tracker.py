@@ -2,11 +2,34 @@
 多人跟踪器 - 使用OpenCV内置跟踪算法
 """
 
+import os
 import cv2
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from typing import Optional, Tuple, List, Dict
 
+# 确保启用 SIMD 优化路径（某些环境下默认可能被关闭）
+cv2.setUseOptimized(True)
+
+try:
+    from scipy.optimize import linear_sum_assignment  # 可选，用于检测与轨迹的最优匹配
+except ImportError:
+    linear_sum_assignment = None
+
+# IoU 核函数按可用性依次选择：Cython 编译版（无 JIT 预热）、Numba 版，都没有时用 NumPy 广播
+try:
+    from tracker_kernels_c import iou_matrix_c as iou_matrix_kernel  # 可选，需先 cythonize 编译
+except ImportError:
+    try:
+        from tracker_kernels import iou_matrix_jit as iou_matrix_kernel  # 可选，需要 numba
+    except ImportError:
+        iou_matrix_kernel = None
+
+# 检测数×轨迹数小于该值时用核函数；更大时 NumPy 广播的开销已可忽略
+JIT_IOU_MAX_PAIRS = 256
+
 
 class TrackerType(Enum):
     """可用的跟踪器类型"""
@@ -37,6 +60,23 @@ def create_tracker(tracker_type: TrackerType):
     return cv2.TrackerCSRT_create()
 
 
+# 检测框与跟踪框的IoU高于该值时沿用现有跟踪器，不重新初始化（CSRT 初始化要重新提取特征，开销大）
+# KCF/MOSSE 是相关滤波跟踪器，对小幅漂移不敏感，阈值放宽
+REUSE_IOU = {
+    TrackerType.CSRT: 0.7,
+    TrackerType.KCF: 0.5,
+    TrackerType.MOSSE: 0.5,
+}
+
+# 跟踪置信度随未检测帧数衰减 max(0.3, 1 - n*0.02)，预先算成查找表（n 超出表长时取末项）
+# 用 Python 元组而不是 ndarray：单元素索引不经过 numpy 标量
+_CONF_TABLE = tuple(np.maximum(0.3, 1.0 - np.arange(512) * 0.02).tolist())
+_CONF_LAST = len(_CONF_TABLE) - 1
+
+# MOSSE 只做帧间传递、靠YOLO纠偏，重检间隔不超过该值
+MOSSE_MAX_REDETECT_INTERVAL = 10
+
+
 def calc_iou(box1: Tuple, box2: Tuple) -> float:
     """计算两个框的IoU"""
     x1_1, y1_1, x2_1, y2_1 = box1
@@ -59,6 +99,58 @@ def calc_iou(box1: Tuple, box2: Tuple) -> float:
     return inter_area / union_area
 
 
+def iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """计算两组框 (N,4)/(M,4) 两两之间的IoU，返回 (N,M)"""
+    if iou_matrix_kernel is not None and len(boxes1) * len(boxes2) < JIT_IOU_MAX_PAIRS:
+        out = np.empty((len(boxes1), len(boxes2)), dtype=np.float32)
+        return iou_matrix_kernel(boxes1, boxes2, out)
+
+    xi1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    yi1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    xi2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    yi2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    inter = np.clip(xi2 - xi1, 0, None) * np.clip(yi2 - yi1, 0, None)
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - inter
+
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+# 匹配代价 = (1 - IoU) + TRACK_CONF_WEIGHT * (1 - 轨迹置信度)，同等重叠时优先匹配可信的轨迹
+TRACK_CONF_WEIGHT = 0.1
+# IoU 未超过阈值的组合代价设为该值，不参与匹配
+UNMATCHABLE = 1e6
+
+
+def match_cost(iou: np.ndarray, track_conf: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """由IoU矩阵 (D,T) 和轨迹置信度 (T,) 计算匹配代价矩阵，以后可在此加入外观距离等项"""
+    cost = (1.0 - iou) + TRACK_CONF_WEIGHT * (1.0 - track_conf)[None, :]
+    cost[iou <= iou_threshold] = UNMATCHABLE
+    return cost
+
+
+def assign_by_cost(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    按代价矩阵匹配检测(行)与轨迹(列)，返回按行号排序的 [(行, 列), ...]
+    有 scipy 时用匈牙利算法求总代价最小的匹配，否则逐行贪心取最小
+    """
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+        keep = cost[rows, cols] < UNMATCHABLE
+        return list(zip(rows[keep].tolist(), cols[keep].tolist()))
+
+    cost = cost.copy()
+    pairs = []
+    for r in range(cost.shape[0]):
+        c = int(cost[r].argmin())
+        if cost[r, c] < UNMATCHABLE:
+            pairs.append((r, c))
+            cost[:, c] = UNMATCHABLE
+    return pairs
+
+
 class TrackedPerson:
     """单个被跟踪的人"""
 
@@ -70,36 +162,39 @@ class TrackedPerson:
         self.frames_since_detection = 0
         self.lost_frames = 0
         self.is_active = True
+        self.tracker_type = tracker_type
 
         # 创建跟踪器
-        self.tracker = create_tracker(tracker_type)
+        self._init_tracker(bbox, frame)
+
+    def _init_tracker(self, bbox: Tuple, frame: np.ndarray):
+        self.tracker = create_tracker(self.tracker_type)
         x1, y1, x2, y2 = bbox
         cv_bbox = (x1, y1, x2 - x1, y2 - y1)
         self.tracker.init(frame, cv_bbox)
 
-    def update_with_detection(self, bbox: Tuple, frame: np.ndarray,
-                               tracker_type: TrackerType):
-        """用新的检测结果更新"""
+    def update_with_detection(self, bbox: Tuple, frame: np.ndarray):
+        """用新的检测结果更新，跟踪框与检测框足够接近时沿用现有跟踪器"""
+        drifted = calc_iou(self.bbox, bbox) <= REUSE_IOU.get(self.tracker_type, 0.7)
         self.bbox = bbox
         self.confidence = 1.0
         self.frames_since_detection = 0
         self.lost_frames = 0
 
-        # 重新初始化跟踪器
-        self.tracker = create_tracker(tracker_type)
-        x1, y1, x2, y2 = bbox
-        cv_bbox = (x1, y1, x2 - x1, y2 - y1)
-        self.tracker.init(frame, cv_bbox)
+        # 漂移过大才重新初始化跟踪器
+        if drifted:
+            self._init_tracker(bbox, frame)
 
     def update_with_tracker(self, frame: np.ndarray) -> bool:
         """用跟踪器更新"""
         success, cv_bbox = self.tracker.update(frame)
 
         if success:
-            x, y, w, h = [int(v) for v in cv_bbox]
-            self.bbox = (x, y, x + w, y + h)
+            x, y, w, h = cv_bbox
+            x, y = int(x), int(y)
+            self.bbox = (x, y, x + int(w), y + int(h))
             self.frames_since_detection += 1
-            self.confidence = max(0.3, 1.0 - self.frames_since_detection * 0.02)
+            self.confidence = _CONF_TABLE[min(self.frames_since_detection, _CONF_LAST)]
             return True
         else:
             self.lost_frames += 1
@@ -119,17 +214,77 @@ class MultiPersonTracker:
     4. 在检测间隔使用轻量跟踪器
     """
 
-    def __init__(self, detector, tracker_type: TrackerType = TrackerType.CSRT,
-                 redetect_interval: int = 30, iou_threshold: float = 0.3):
+    def __init__(self, detector, tracker_type: TrackerType = TrackerType.MOSSE,
+                 redetect_interval: int = 30, iou_threshold: float = 0.3,
+                 batch_size: int = 4, motion_threshold: float = 2.0):
         self.detector = detector
         self.tracker_type = tracker_type
+        if tracker_type == TrackerType.MOSSE:
+            redetect_interval = min(redetect_interval, MOSSE_MAX_REDETECT_INTERVAL)
         self.redetect_interval = redetect_interval
         self.iou_threshold = iou_threshold
+        self.batch_size = batch_size  # process_frames 中每次批量检测的关键帧数
+        # 画面相对上次YOLO检测的平均灰度变化低于该值时跳过定期检测，0 表示不跳过
+        # MOSSE 靠定期检测纠偏，不跳过：静止广角画面里的小目标平均变化很小，跳过后漂移得不到纠正
+        self.motion_threshold = 0 if tracker_type == TrackerType.MOSSE else motion_threshold
+        self._last_yolo_tiny = None  # 上次YOLO检测帧的 64x64 灰度缩略图
 
         self.tracked_persons: Dict[int, TrackedPerson] = {}
         self.next_id = 1
         self.frame_count = 0
 
+        # 批量检测：待检测的 (帧号, 帧) 与已算好的 帧号 -> 检测结果
+        self.pending_frames = deque()
+        self._batch_detections: Dict[int, list] = {}
+
+        # 与 tracked_persons 顺序一致的数组，匹配和清理时不必逐个读对象属性
+        self._ids = np.empty(0, dtype=np.int32)
+        self._bboxes = np.empty((0, 4), dtype=np.float32)
+        self._active = np.empty(0, dtype=bool)
+        self._confs = np.empty(0, dtype=np.float32)
+        # 本帧变为不活跃的轨迹数，为0时 _cleanup_inactive 直接返回
+        self._inactive_count = 0
+
+        # OpenCV 跟踪器 update 期间释放 GIL，多人时并行更新（首次需要时创建）
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _sync_arrays(self):
+        """轨迹增删后按 tracked_persons 重建数组"""
+        persons = self.tracked_persons
+        self._ids = np.fromiter(persons.keys(), dtype=np.int32, count=len(persons))
+        self._bboxes = np.array([p.bbox for p in persons.values()], dtype=np.float32).reshape(-1, 4)
+        self._active = np.fromiter((p.is_active for p in persons.values()), dtype=bool, count=len(persons))
+        self._confs = np.fromiter((p.confidence for p in persons.values()), dtype=np.float32, count=len(persons))
+
+    def _update_tracks(self, items: List[Tuple[int, int, TrackedPerson]], frame: np.ndarray) -> List:
+        """
+        用跟踪器更新多条轨迹 [(数组下标, ID, 轨迹), ...]，并同步到数组
+        返回成功更新的 [(ID, bbox, confidence, "tracker"), ...]
+        """
+        if len(items) > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+            # 各跟踪器只读同一帧，互不影响
+            futures = [self._pool.submit(person.update_with_tracker, frame) for _, _, person in items]
+            successes = [f.result() for f in futures]
+        else:
+            successes = [person.update_with_tracker(frame) for _, _, person in items]
+
+        results = []
+        for (idx, track_id, person), success in zip(items, successes):
+            if success:
+                self._bboxes[idx] = person.bbox
+                self._confs[idx] = person.confidence
+                results.append((track_id, person.bbox, person.confidence, "tracker"))
+            elif self._active[idx] and not person.is_active:
+                self._active[idx] = False
+                self._inactive_count += 1
+        return results
+
+    def _is_keyframe(self, frame_no: int) -> bool:
+        """按间隔需要YOLO重新检测的帧（帧号从1开始）"""
+        return frame_no == 1 or frame_no % self.redetect_interval == 0
+
     def process_frame(self, frame: np.ndarray) -> List[Tuple[int, Tuple, float, str]]:
         """
         处理一帧
@@ -141,12 +296,15 @@ class MultiPersonTracker:
         self.frame_count += 1
         results = []
 
-        # 判断是否需要YOLO检测
-        need_yolo = (
-            self.frame_count == 1 or
-            self.frame_count % self.redetect_interval == 0 or
-            len(self.tracked_persons) == 0
-        )
+        # 判断是否需要YOLO检测：没有轨迹时必须检测；定期检测在画面基本没变时跳过
+        if len(self.tracked_persons) == 0:
+            need_yolo = True
+        elif self._is_keyframe(self.frame_count):
+            need_yolo = self._scene_changed(frame)
+            if not need_yolo:
+                self._batch_detections.pop(self.frame_count, None)
+        else:
+            need_yolo = False
 
         if need_yolo:
             results = self._process_with_yolo(frame)
@@ -158,9 +316,62 @@ class MultiPersonTracker:
 
         return results
 
+    @staticmethod
+    def _tiny_gray(frame: np.ndarray) -> np.ndarray:
+        tiny = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(tiny, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def _scene_changed(self, frame: np.ndarray) -> bool:
+        """与上次YOLO检测的帧相比画面是否有明显变化（只在关键帧计算，约几十微秒）"""
+        if self.motion_threshold <= 0 or self._last_yolo_tiny is None:
+            return True
+        return self._moved(self._tiny_gray(frame), self._last_yolo_tiny)
+
+    def _moved(self, tiny: np.ndarray, ref_tiny: np.ndarray) -> bool:
+        return np.abs(tiny - ref_tiny).mean() >= self.motion_threshold
+
+    def process_frames(self, frames: List[np.ndarray]) -> List[List[Tuple[int, Tuple, float, str]]]:
+        """
+        按顺序处理连续的多帧，结果与逐帧调用 process_frame 相同
+
+        检测结果只取决于帧本身，所以先把其中的关键帧按 batch_size 一组送入
+        detector.detect_batch，再逐帧跟踪；跟踪中途丢失全部目标时仍单帧检测。
+        排队时就按画面变化预判：与上一个排队（或上次实际检测）的帧相比基本没变的关键帧
+        不送检，避免批量检测后才被 process_frame 丢弃
+        """
+        ref_tiny = self._last_yolo_tiny
+        for i, frame in enumerate(frames):
+            frame_no = self.frame_count + 1 + i
+            if not self._is_keyframe(frame_no):
+                continue
+            if self.motion_threshold > 0:
+                tiny = self._tiny_gray(frame)
+                if ref_tiny is not None and not self._moved(tiny, ref_tiny):
+                    continue
+                ref_tiny = tiny
+            self.pending_frames.append((frame_no, frame))
+            if len(self.pending_frames) >= self.batch_size:
+                self._flush_yolo_batch()
+        self._flush_yolo_batch()
+
+        return [self.process_frame(frame) for frame in frames]
+
+    def _flush_yolo_batch(self):
+        """对排队的关键帧做一次批量检测"""
+        if not self.pending_frames:
+            return
+        frame_nos, frames = zip(*self.pending_frames)
+        self.pending_frames.clear()
+        for frame_no, detections in zip(frame_nos, self.detector.detect_batch(list(frames))):
+            self._batch_detections[frame_no] = detections
+
     def _process_with_yolo(self, frame: np.ndarray) -> List:
         """使用YOLO检测并匹配"""
-        detections = self.detector.detect(frame)
+        detections = self._batch_detections.pop(self.frame_count, None)
+        if detections is None:
+            detections = self.detector.detect(frame)
+        if self.motion_threshold > 0:
+            self._last_yolo_tiny = self._tiny_gray(frame)
         results = []
 
         if not detections:
@@ -168,93 +379,90 @@ class MultiPersonTracker:
             return self._process_with_trackers(frame)
 
         # 匹配检测与现有轨迹
-        matched_track_ids = set()
-        matched_det_indices = set()
+        det_matched = np.zeros(len(detections), dtype=bool)
+        trk_matched = np.zeros(len(self.tracked_persons), dtype=bool)
 
-        # 计算所有IoU
+        # 一次算出所有检测与轨迹的代价矩阵再做匹配
         if self.tracked_persons:
-            for det_idx, det in enumerate(detections):
+            dets = np.asarray([det[:4] for det in detections], dtype=np.float32)
+            cost = match_cost(iou_matrix(dets, self._bboxes), self._confs, self.iou_threshold)
+
+            for det_idx, trk_idx in assign_by_cost(cost):
+                det = detections[det_idx]
                 det_bbox = det[:4]
-                best_iou = 0
-                best_track_id = None
-
-                for track_id, person in self.tracked_persons.items():
-                    if track_id in matched_track_ids:
-                        continue
-                    iou = calc_iou(det_bbox, person.bbox)
-                    if iou > best_iou and iou > self.iou_threshold:
-                        best_iou = iou
-                        best_track_id = track_id
-
-                if best_track_id is not None:
-                    # 匹配成功，更新轨迹
-                    self.tracked_persons[best_track_id].update_with_detection(
-                        det_bbox, frame, self.tracker_type
-                    )
-                    matched_track_ids.add(best_track_id)
-                    matched_det_indices.add(det_idx)
-                    results.append((
-                        best_track_id,
-                        det_bbox,
-                        det[4],
-                        "yolo"
-                    ))
+                track_id = int(self._ids[trk_idx])
+                # 匹配成功，更新轨迹
+                self.tracked_persons[track_id].update_with_detection(det_bbox, frame)
+                self._bboxes[trk_idx] = det_bbox
+                self._confs[trk_idx] = 1.0
+                det_matched[det_idx] = True
+                trk_matched[trk_idx] = True
+                results.append((
+                    track_id,
+                    det_bbox,
+                    det[4],
+                    "yolo"
+                ))
 
         # 为未匹配的检测创建新轨迹
-        for det_idx, det in enumerate(detections):
-            if det_idx not in matched_det_indices:
-                det_bbox = det[:4]
-                new_id = self.next_id
-                self.next_id += 1
-
-                self.tracked_persons[new_id] = TrackedPerson(
-                    new_id, det_bbox, frame, self.tracker_type
-                )
-                results.append((new_id, det_bbox, det[4], "yolo"))
-
-        # 用跟踪器更新未匹配的现有轨迹
-        for track_id, person in self.tracked_persons.items():
-            if track_id not in matched_track_ids:
-                if person.update_with_tracker(frame):
-                    results.append((
-                        track_id,
-                        person.bbox,
-                        person.confidence,
-                        "tracker"
-                    ))
+        if not det_matched.all():
+            for det_idx, det in enumerate(detections):
+                if not det_matched[det_idx]:
+                    det_bbox = det[:4]
+                    new_id = self.next_id
+                    self.next_id += 1
+
+                    self.tracked_persons[new_id] = TrackedPerson(
+                        new_id, det_bbox, frame, self.tracker_type
+                    )
+                    results.append((new_id, det_bbox, det[4], "yolo"))
+            self._sync_arrays()
+
+        # 用跟踪器更新未匹配的现有轨迹（新建的轨迹排在数组末尾，同样视为未匹配）
+        unmatched = [
+            (idx, track_id, person)
+            for idx, (track_id, person) in enumerate(self.tracked_persons.items())
+            if idx >= len(trk_matched) or not trk_matched[idx]
+        ]
+        results.extend(self._update_tracks(unmatched, frame))
 
         return results
 
     def _process_with_trackers(self, frame: np.ndarray) -> List:
         """只使用跟踪器更新"""
-        results = []
-
-        for track_id, person in self.tracked_persons.items():
-            if person.is_active:
-                if person.update_with_tracker(frame):
-                    results.append((
-                        track_id,
-                        person.bbox,
-                        person.confidence,
-                        "tracker"
-                    ))
-
-        return results
+        active = [
+            (idx, track_id, person)
+            for idx, (track_id, person) in enumerate(self.tracked_persons.items())
+            if self._active[idx]
+        ]
+        return self._update_tracks(active, frame)
 
     def _cleanup_inactive(self):
         """清理不活跃的轨迹"""
-        inactive_ids = [
-            tid for tid, p in self.tracked_persons.items()
-            if not p.is_active
-        ]
-        for tid in inactive_ids:
+        if self._inactive_count == 0:
+            return
+        self._inactive_count = 0
+        keep = self._active
+        for tid in self._ids[~keep].tolist():
             del self.tracked_persons[tid]
+        self._ids = self._ids[keep]
+        self._bboxes = self._bboxes[keep]
+        self._active = self._active[keep]
+        self._confs = self._confs[keep]
 
     def reset(self):
         """重置所有状态"""
         self.tracked_persons.clear()
         self.next_id = 1
         self.frame_count = 0
+        self.pending_frames.clear()
+        self._batch_detections.clear()
+        self._last_yolo_tiny = None
+        self._sync_arrays()
+        self._inactive_count = 0
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
 
 # 保留旧接口兼容
@@ -289,10 +497,11 @@ class LightweightTracker:
             return False, None, 0.0
         success, cv_bbox = self.tracker.update(frame)
         if success:
-            x, y, w, h = [int(v) for v in cv_bbox]
-            self.bbox = (x, y, x + w, y + h)
+            x, y, w, h = cv_bbox
+            x, y = int(x), int(y)
+            self.bbox = (x, y, x + int(w), y + int(h))
             self.frames_since_init += 1
-            self.confidence = max(0.3, 1.0 - self.frames_since_init * 0.02)
+            self.confidence = _CONF_TABLE[min(self.frames_since_init, _CONF_LAST)]
             return True, self.bbox, self.confidence
         else:
             self.is_initialized = False
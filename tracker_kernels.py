@@ -0,0 +1,115 @@
+"""
+跟踪/检测内循环的 Numba 加速核函数（需要安装 numba，tracker.py 和 yolo_detector.py 中可选导入）
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def iou_matrix_jit(dets, trks, out):
+    """计算 dets (D,4) 与 trks (T,4) 两两之间的IoU写入 out (D,T)，不产生中间数组"""
+    for i in range(dets.shape[0]):
+        dx1, dy1, dx2, dy2 = dets[i, 0], dets[i, 1], dets[i, 2], dets[i, 3]
+        det_area = (dx2 - dx1) * (dy2 - dy1)
+        for j in range(trks.shape[0]):
+            iw = min(dx2, trks[j, 2]) - max(dx1, trks[j, 0])
+            ih = min(dy2, trks[j, 3]) - max(dy1, trks[j, 1])
+            if iw <= 0 or ih <= 0:
+                out[i, j] = 0
+                continue
+            inter = iw * ih
+            union = det_area + (trks[j, 2] - trks[j, 0]) * (trks[j, 3] - trks[j, 1]) - inter
+            out[i, j] = inter / union if union > 0 else 0
+    return out
+
+
+@njit(cache=True, boundscheck=False)
+def postprocess_jit(preds, cls_row, conf_thr, input_size, scale, pad_w, pad_h, orig_w, orig_h, out):
+    """
+    YOLOv8 输出 preds (84, N) 一次扫描: 过滤置信度并还原到原图坐标
+
+    只把通过阈值的候选写入 out (N, 5) 的前几行 [x1, y1, x2, y2, score]，返回行数。
+    全程按 float32 计算，与 NumPy 版本的结果逐位一致。
+    阈值和输入尺寸按参数传入而不做常量特化：循环受访存限制，特化后并不更快，
+    反而每个检测器都要重新编译且无法缓存。
+    """
+    conf_thr = np.float32(conf_thr)
+    size = np.float32(input_size)
+    scale = np.float32(scale)
+    pad_w = np.float32(pad_w)
+    pad_h = np.float32(pad_h)
+    max_w = np.float32(orig_w)
+    max_h = np.float32(orig_h)
+    half = np.float32(2)
+    zero = np.float32(0)
+    n = 0
+    for j in range(preds.shape[1]):
+        score = preds[cls_row, j]
+        if score <= conf_thr:
+            continue
+        cx = preds[0, j] * size
+        cy = preds[1, j] * size
+        bw = preds[2, j] * size
+        bh = preds[3, j] * size
+        out[n, 0] = min(max((cx - bw / half - pad_w) / scale, zero), max_w)
+        out[n, 1] = min(max((cy - bh / half - pad_h) / scale, zero), max_h)
+        out[n, 2] = min(max((cx + bw / half - pad_w) / scale, zero), max_w)
+        out[n, 3] = min(max((cy + bh / half - pad_h) / scale, zero), max_h)
+        out[n, 4] = score
+        n += 1
+    return n
+
+
+@njit(cache=True, boundscheck=False)
+def nms_jit(rows, n, iou_threshold, keep):
+    """
+    对 postprocess_jit 写出的前 n 行 [x1, y1, x2, y2, score] 做贪心 NMS，
+    保留行号按置信度降序写入 keep，返回保留数
+
+    与 cv2.dnn.NMSBoxes 一致：分数相同时行号小的优先；框按 (x, y, w, h) 双精度计算 IoU，
+    与已保留框的 IoU 大于阈值 (float32) 时抑制
+    """
+    thr = np.float64(np.float32(iou_threshold))
+    neg = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        neg[i] = -np.float64(rows[i, 4])
+    order = np.argsort(neg, kind='mergesort')
+
+    k = 0
+    for oi in range(n):
+        i = order[oi]
+        ax = np.float64(rows[i, 0])
+        ay = np.float64(rows[i, 1])
+        aw = np.float64(rows[i, 2] - rows[i, 0])
+        ah = np.float64(rows[i, 3] - rows[i, 1])
+        suppressed = False
+        for kj in range(k):
+            j = keep[kj]
+            bx = np.float64(rows[j, 0])
+            by = np.float64(rows[j, 1])
+            bw = np.float64(rows[j, 2] - rows[j, 0])
+            bh = np.float64(rows[j, 3] - rows[j, 1])
+            area_sum = aw * ah + bw * bh
+            if area_sum <= 2.220446049250313e-16:
+                overlap = 1.0
+            else:
+                iw = min(ax + aw, bx + bw) - max(ax, bx)
+                ih = min(ay + ah, by + bh) - max(ay, by)
+                inter = iw * ih if iw > 0 and ih > 0 else 0.0
+                overlap = 1.0 - (1.0 - inter / (area_sum - inter))
+            if overlap > thr:
+                suppressed = True
+                break
+        if not suppressed:
+            keep[k] = i
+            k += 1
+    return k
+
+
+# 导入时先编译（有缓存时直接加载），避免第一次检测匹配时卡顿
+_warmup = np.zeros((1, 4), dtype=np.float32)
+iou_matrix_jit(_warmup, _warmup, np.empty((1, 1), dtype=np.float32))
+postprocess_jit(np.zeros((84, 1), dtype=np.float32), 4, 0.5, 640, 1.0, 0, 0, 640, 640,
+                np.empty((1, 5), dtype=np.float32))
+nms_jit(np.zeros((1, 5), dtype=np.float32), 1, 0.45, np.empty(1, dtype=np.intp))
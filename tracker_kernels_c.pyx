@@ -0,0 +1,34 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+跟踪内循环的 Cython 版核函数（不想依赖 numba 时使用，tracker.py 中可选导入）
+
+编译 (需要 Cython 和 C 编译器，生成的扩展模块放在项目根目录即可):
+    cythonize -i tracker_kernels_c.pyx
+"""
+
+
+cdef void _iou_matrix(const float[:, ::1] dets, const float[:, ::1] trks,
+                      float[:, ::1] out) noexcept nogil:
+    cdef Py_ssize_t i, j
+    cdef float dx1, dy1, dx2, dy2, det_area, iw, ih, inter, union
+    for i in range(dets.shape[0]):
+        dx1 = dets[i, 0]
+        dy1 = dets[i, 1]
+        dx2 = dets[i, 2]
+        dy2 = dets[i, 3]
+        det_area = (dx2 - dx1) * (dy2 - dy1)
+        for j in range(trks.shape[0]):
+            iw = min(dx2, trks[j, 2]) - max(dx1, trks[j, 0])
+            ih = min(dy2, trks[j, 3]) - max(dy1, trks[j, 1])
+            if iw <= 0 or ih <= 0:
+                out[i, j] = 0
+                continue
+            inter = iw * ih
+            union = det_area + (trks[j, 2] - trks[j, 0]) * (trks[j, 3] - trks[j, 1]) - inter
+            out[i, j] = inter / union if union > 0 else 0
+
+
+def iou_matrix_c(dets, trks, out):
+    """计算 dets (D,4) 与 trks (T,4) 两两之间的IoU写入 out (D,T)，三者均为 C 连续 float32"""
+    _iou_matrix(dets, trks, out)
+    return out
@@ -4,44 +4,113 @@
 
 import cv2
 import numpy as np
+from functools import lru_cache
 from pathlib import Path
 from typing import Callable, Optional, List, Tuple
 import time
+import queue
 import random
+import threading
 
+from ffmpeg_writer import FFmpegError, open_video_writer
 from yolo_detector import YOLODetector
 from tracker import MultiPersonTracker, TrackerType
 
 
 # 为每个ID分配固定颜色
+@lru_cache(maxsize=None)
 def get_color_for_id(person_id: int) -> Tuple[int, int, int]:
-    """根据ID生成固定颜色"""
-    random.seed(person_id * 100)
+    """根据ID生成固定颜色（每个ID只算一次；用独立的随机数生成器，不影响全局 random 状态）"""
+    rng = random.Random(person_id * 100)
     return (
-        random.randint(50, 255),
-        random.randint(50, 255),
-        random.randint(50, 255)
+        rng.randint(50, 255),
+        rng.randint(50, 255),
+        rng.randint(50, 255)
     )
 
 
+def open_capture(path: str) -> cv2.VideoCapture:
+    """
+    打开视频，优先请求 FFmpeg 硬件解码（NVDEC / VAAPI / D3D11 / QSV 由 OpenCV 按平台选择），
+    没有可用硬件时 OpenCV 自动用软件解码；FFmpeg 后端打不开时再用默认后端
+    """
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG,
+                           [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+    if cap.isOpened():
+        return cap
+    cap.release()
+    return cv2.VideoCapture(path)
+
+
+@lru_cache(maxsize=1024)
+def get_id_label(person_id: int) -> Tuple[str, Tuple[int, int]]:
+    """ID标签文字及其尺寸（每个ID只测量一次）"""
+    label = f"ID:{person_id}"
+    label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+    return label, label_size
+
+
+@lru_cache(maxsize=1024)
+def get_id_label_tile(person_id: int) -> np.ndarray:
+    """
+    预渲染的ID标签块（底色 + 白字），尺寸 (h+11, w+11, 3)
+    标签文字不会超出底色矩形，直接贴图与 rectangle + putText 的结果逐像素一致
+    """
+    label, (label_w, label_h) = get_id_label(person_id)
+    tile = np.empty((label_h + 11, label_w + 11, 3), dtype=np.uint8)
+    tile[:] = get_color_for_id(person_id)
+    cv2.putText(tile, label, (5, label_h + 5),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    tile.flags.writeable = False
+    return tile
+
+
+def paste_tile(output: np.ndarray, tile: np.ndarray, x: int, y: int):
+    """把 tile 贴到 output 的 (x, y) 处，超出画面的部分裁掉"""
+    h, w = output.shape[:2]
+    tile_h, tile_w = tile.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + tile_w, w), min(y + tile_h, h)
+    if x0 < x1 and y0 < y1:
+        output[y0:y1, x0:x1] = tile[y0 - y:y1 - y, x0 - x:x1 - x]
+
+
+# 叠加的统计 FPS 每隔多少秒刷新一次
+OVERLAY_FPS_REFRESH = 1.0
+
+
 class VideoProcessor:
     """视频处理器 - 多人跟踪"""
 
     def __init__(self, detector: YOLODetector = None,
-                 tracker_type: TrackerType = TrackerType.CSRT,
-                 redetect_interval: int = 30):
+                 tracker_type: TrackerType = TrackerType.MOSSE,
+                 redetect_interval: int = 30, yolo_batch: int = 1, prefetch: int = 8):
+        """
+        Args:
+            yolo_batch: 每次批量检测的关键帧数，大于1时预读 redetect_interval*yolo_batch 帧，
+                        用一次推理检测其中的所有关键帧（内存占用随之增加）
+            prefetch: 解码和编码线程各自最多缓冲的帧数
+        """
         if detector is None:
             detector = YOLODetector()
 
+        self.yolo_batch = max(1, yolo_batch)
+        self.prefetch = max(1, prefetch)
         self.multi_tracker = MultiPersonTracker(
             detector=detector,
             tracker_type=tracker_type,
-            redetect_interval=redetect_interval
+            redetect_interval=redetect_interval,
+            batch_size=self.yolo_batch
         )
 
         self.is_processing = False
         self.should_stop = False
 
+        # 统计文字叠加：显示的 FPS 及其刷新时间，缓存的 (内容, 文字条带, 临时缓冲)
+        self._overlay_fps = 0.0
+        self._overlay_fps_time = 0.0
+        self._overlay = None
+
         self.stats = {
             "total_frames": 0,
             "yolo_frames": 0,
@@ -58,6 +127,8 @@ class VideoProcessor:
         self.is_processing = True
         self.should_stop = False
         self.multi_tracker.reset()
+        self._overlay_fps = 0.0
+        self._overlay_fps_time = 0.0
 
         self.stats = {
             "total_frames": 0,
@@ -67,7 +138,7 @@ class VideoProcessor:
             "avg_fps": 0.0
         }
 
-        cap = cv2.VideoCapture(input_path)
+        cap = open_capture(input_path)
         if not cap.isOpened():
             raise ValueError(f"无法打开视频文件: {input_path}")
 
@@ -76,65 +147,180 @@ class VideoProcessor:
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
+        # 有 ffmpeg 时通过管道编码 H.264（优先 NVENC），编码在 ffmpeg 进程中进行；否则退回 mp4v
         writer = None
         if output_path:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
             effective_fps = fps / (skip_frames + 1)
-            writer = cv2.VideoWriter(output_path, fourcc, effective_fps, (width, height))
+            writer = open_video_writer(output_path, effective_fps, (width, height))
 
-        frame_count = 0
         start_time = time.time()
+        # 每组读取的待处理帧数：不批量检测时逐帧处理
+        chunk_size = self.multi_tracker.redetect_interval * self.yolo_batch if self.yolo_batch > 1 else 1
+
+        # 解码 → 跟踪绘制 → 编码 三段流水线：读帧线程和写帧线程与主线程重叠执行，
+        # 跟踪器状态只在主线程中访问。队列有界，解码过快时读帧线程阻塞等待
+        read_q = queue.Queue(maxsize=self.prefetch)
+        write_q = queue.Queue(maxsize=self.prefetch)
+        free_q = queue.Queue()  # 用完的帧缓冲，读帧线程优先解码到这些缓冲里
+        stop_event = threading.Event()
+        read_errors = []
+        write_errors = []
+
+        reader = threading.Thread(target=self._read_frames, daemon=True,
+                                  args=(cap, skip_frames, read_q, free_q, stop_event, read_errors))
+        reader.start()
+        writer_thread = None
+        if writer:
+            writer_thread = threading.Thread(target=self._write_frames, daemon=True,
+                                             args=(writer, write_q, free_q, write_errors))
+            writer_thread.start()
+
+        need_draw = writer is not None or preview_callback is not None
+        stats = self.stats
 
         try:
-            while not self.should_stop:
-                ret, frame = cap.read()
-                if not ret:
+            eof = False
+            # 写帧线程出错后（如 ffmpeg 退出）后面的帧已无法写出，立即停止处理
+            while not self.should_stop and not eof and not write_errors:
+                chunk = []  # [(帧号, 帧), ...]
+                while len(chunk) < chunk_size:
+                    item = read_q.get()
+                    if item is None:
+                        eof = True
+                        break
+                    chunk.append(item)
+
+                if not chunk:
                     break
 
-                frame_count += 1
-
-                if skip_frames > 0 and (frame_count - 1) % (skip_frames + 1) != 0:
-                    continue
-
-                self.stats["total_frames"] += 1
-
                 # 多人跟踪
-                results = self.multi_tracker.process_frame(frame)
-
-                # 更新统计
-                yolo_count = sum(1 for r in results if r[3] == "yolo")
-                tracker_count = sum(1 for r in results if r[3] == "tracker")
-                self.stats["yolo_frames"] += 1 if yolo_count > 0 else 0
-                self.stats["tracker_frames"] += 1 if tracker_count > 0 and yolo_count == 0 else 0
-                self.stats["total_persons"] = self.multi_tracker.next_id - 1
-
-                # 绘制结果
-                output_frame = self._draw_results(frame, results)
-
-                if writer:
-                    writer.write(output_frame)
-
-                if preview_callback:
-                    preview_callback(output_frame)
-
-                if progress_callback:
-                    elapsed = time.time() - start_time
-                    if elapsed > 0:
-                        self.stats["avg_fps"] = self.stats["total_frames"] / elapsed
-                    progress_callback(frame_count, total_frames, self.stats.copy())
+                if len(chunk) == 1:
+                    results_list = [self.multi_tracker.process_frame(chunk[0][1])]
+                else:
+                    results_list = self.multi_tracker.process_frames([frame for _, frame in chunk])
+
+                for (frame_no, frame), results in zip(chunk, results_list):
+                    if self.should_stop or write_errors:
+                        break
+
+                    stats["total_frames"] += 1
+
+                    # 更新统计：本帧有YOLO结果算YOLO帧，否则有跟踪结果算跟踪帧
+                    has_yolo = has_tracker = False
+                    for r in results:
+                        if r[3] == "yolo":
+                            has_yolo = True
+                            break
+                        has_tracker = True
+                    if has_yolo:
+                        stats["yolo_frames"] += 1
+                    elif has_tracker:
+                        stats["tracker_frames"] += 1
+                    stats["total_persons"] = self.multi_tracker.next_id - 1
+
+                    # 绘制结果（直接画在解码帧上；只统计不输出时跳过）
+                    if need_draw:
+                        frame = self._draw_results(frame, results)
+
+                    # 预览直接拿这一帧的只读视图（不复制）：写帧线程同时在编码它，
+                    # 之后缓冲还会回收给解码线程，回调要保留画面必须自行复制
+                    if preview_callback:
+                        view = frame.view()
+                        view.flags.writeable = False
+                        preview_callback(view)
+
+                    # 有写帧线程时由它写完后回收缓冲
+                    if writer_thread:
+                        write_q.put(frame)
+                    else:
+                        free_q.put(frame)
+
+                    if progress_callback:
+                        elapsed = time.time() - start_time
+                        if elapsed > 0:
+                            stats["avg_fps"] = stats["total_frames"] / elapsed
+                        progress_callback(frame_no, total_frames, stats.copy())
 
         finally:
+            stop_event.set()
+            if writer_thread:
+                write_q.put(None)
+                writer_thread.join()
+            reader.join()
             cap.release()
             if writer:
-                writer.release()
+                try:
+                    writer.release()
+                except FFmpegError as e:  # 封装失败（磁盘已满等）
+                    write_errors.append(e)
             self.is_processing = False
 
+        if read_errors:
+            raise read_errors[0]
+        if write_errors:
+            raise write_errors[0]
+
         return self.stats
 
+    def _read_frames(self, cap, skip_frames: int, read_q: queue.Queue,
+                     free_q: queue.Queue, stop_event: threading.Event, read_errors: list):
+        """读帧线程：按跳帧设置解码，(帧号, 帧) 放入 read_q，结束或出错时放入 None"""
+        frame_count = 0
+        buf = None  # 被跳过的帧直接复用为下一帧的解码缓冲
+        try:
+            while not stop_event.is_set():
+                if buf is None:
+                    try:
+                        buf = free_q.get_nowait()
+                    except queue.Empty:
+                        pass
+                ret, frame = cap.read(buf)
+                buf = None
+                if not ret:
+                    break
+
+                frame_count += 1
+
+                if skip_frames > 0 and (frame_count - 1) % (skip_frames + 1) != 0:
+                    buf = frame
+                    continue
+                if not self._put_until_stopped(read_q, (frame_count, frame), stop_event):
+                    return
+        except Exception as e:  # 解码出错时记录，由主线程重新抛出
+            read_errors.append(e)
+        finally:
+            # 出错也要放入结束标记，否则主线程会一直等待 read_q
+            self._put_until_stopped(read_q, None, stop_event)
+
+    @staticmethod
+    def _put_until_stopped(q: queue.Queue, item, stop_event: threading.Event) -> bool:
+        """队列满时等待，主线程已停止时放弃，返回是否放入"""
+        while not stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    @staticmethod
+    def _write_frames(writer, write_q: queue.Queue, free_q: queue.Queue, errors: list):
+        """写帧线程：编码 write_q 中的帧直到 None，写完的缓冲交回读帧线程复用"""
+        while True:
+            frame = write_q.get()
+            if frame is None:
+                return
+            if not errors:
+                try:
+                    writer.write(frame)
+                except Exception as e:  # 出错后继续取走剩余帧，避免主线程阻塞
+                    errors.append(e)
+            free_q.put(frame)
+
     def _draw_results(self, frame: np.ndarray,
                       results: List[Tuple[int, Tuple, float, str]]) -> np.ndarray:
-        """绘制多人跟踪结果"""
-        output = frame.copy()
+        """绘制多人跟踪结果（就地绘制，frame 在跟踪完成后不再使用）"""
+        output = frame
 
         for person_id, bbox, confidence, method in results:
             x1, y1, x2, y2 = bbox
@@ -148,44 +334,59 @@ class VideoProcessor:
             # 绘制边界框
             cv2.rectangle(output, (x1, y1), (x2, y2), color, thickness)
 
-            # 绘制ID标签
-            label = f"ID:{person_id}"
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
-
-            # 标签背景
-            cv2.rectangle(output,
-                          (x1, y1 - label_size[1] - 10),
-                          (x1 + label_size[0] + 10, y1),
-                          color, -1)
-
-            # 标签文字
-            cv2.putText(output, label, (x1 + 5, y1 - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            # 绘制ID标签（背景和文字一次贴图）
+            tile = get_id_label_tile(person_id)
+            paste_tile(output, tile, x1, y1 - tile.shape[0] + 1)
 
             # 置信度和方法（小字）
             info = f"{method} {confidence:.2f}"
             cv2.putText(output, info, (x1, y2 + 20),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
-        # 统计信息
+        # 统计信息（FPS 每秒刷新一次，文字不变时不重新栅格化）
+        now = time.time()
+        if now - self._overlay_fps_time >= OVERLAY_FPS_REFRESH:
+            self._overlay_fps = self.stats['avg_fps']
+            self._overlay_fps_time = now
         active_count = len(results)
-        stats_text = f"Tracking: {active_count} | Total IDs: {self.stats['total_persons']} | FPS: {self.stats['avg_fps']:.1f}"
-        cv2.putText(output, stats_text, (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        stats_text = f"Tracking: {active_count} | Total IDs: {self.stats['total_persons']} | FPS: {self._overlay_fps:.1f}"
+        self._blit_stats_text(output, stats_text)
 
         return output
 
+    def _blit_stats_text(self, output: np.ndarray, text: str):
+        """
+        左上角叠加白色统计文字：文字先渲染到黑底条带并缓存，每帧按条带亮度混合
+        out = roi + (255 - roi) * strip / 255，与直接 putText（含抗锯齿）的结果逐像素一致
+        """
+        h, w = output.shape[:2]
+        key = (text, h, w)
+        if self._overlay is None or self._overlay[0] != key:
+            (text_w, _), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+            strip = np.zeros((min(h, 30 + baseline + 4), min(w, 10 + text_w + 4), 3), dtype=np.uint8)
+            cv2.putText(strip, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            self._overlay = (key, strip, np.empty_like(strip))
+
+        _, strip, tmp = self._overlay
+        roi = output[:strip.shape[0], :strip.shape[1]]
+        cv2.subtract(255, roi, dst=tmp)
+        cv2.multiply(tmp, strip, dst=tmp, scale=1 / 255)
+        cv2.add(roi, tmp, dst=roi)
+
     def stop(self):
         self.should_stop = True
 
 
 def process_video_cli(input_path: str, output_path: str = None,
-                      redetect_interval: int = 30, skip_frames: int = 0):
+                      redetect_interval: int = 30, skip_frames: int = 0,
+                      yolo_batch: int = 1):
     """命令行处理视频"""
     print(f"处理视频: {input_path}")
     print(f"重新检测间隔: {redetect_interval} 帧")
+    if yolo_batch > 1:
+        print(f"YOLO批量: {yolo_batch} 个关键帧/次")
 
-    processor = VideoProcessor(redetect_interval=redetect_interval)
+    processor = VideoProcessor(redetect_interval=redetect_interval, yolo_batch=yolo_batch)
 
     def progress_cb(current, total, stats):
         pct = current / total * 100
@@ -211,10 +412,11 @@ if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 2:
-        print("用法: python video_processor.py <input_video> [output_video]")
+        print("用法: python video_processor.py <input_video> [output_video] [yolo_batch]")
         sys.exit(1)
 
     input_video = sys.argv[1]
     output_video = sys.argv[2] if len(sys.argv) > 2 else None
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 1
 
-    process_video_cli(input_video, output_video)
+    process_video_cli(input_video, output_video, yolo_batch=batch)
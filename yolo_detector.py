@@ -1,35 +1,118 @@
 """
-YOLO人物检测器 - 使用OpenCV DNN模块 (无需PyTorch/onnxruntime)
+YOLO人物检测器 - 默认使用OpenCV DNN模块 (无需PyTorch)，安装了 onnxruntime 时可切换到 ORT 后端
 """
 
 import cv2
 import numpy as np
 from pathlib import Path
 
+try:
+    import onnxruntime as ort
+except ImportError:  # 可选依赖，未安装时只能用 OpenCV DNN 后端
+    ort = None
+
+try:
+    from tracker_kernels import nms_jit, postprocess_jit  # 可选，需要 numba
+except ImportError:
+    postprocess_jit = nms_jit = None
+
+
+# ORT 执行后端优先级，未安装的跳过（CPU 总是可用）
+ORT_PROVIDERS = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+
+# NMS 的 IoU 阈值
+NMS_IOU_THRESHOLD = 0.45
+
+# OpenCV DNN 后端候选 (名称, 后端, 目标, 是否用FP16模型)，按优先级排列；OpenCV 编译时未启用的会跳过
+DNN_TARGETS = [
+    ("CUDA FP16", cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16, True),
+    ("OpenVINO", cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU, False),
+]
+
+
+# letterbox 灰边 114 归一化后的值（与 uint8 114 乘 1/255 的 float32 结果一致）
+_INV_255 = np.float32(1/255.0)
+_PAD_VALUE = np.float32(114) * _INV_255
+
+
+def letterbox_geometry(w: int, h: int, size: int):
+    """保持宽高比缩放到 size×size 的几何参数: (scale, new_w, new_h, pad_w, pad_h)"""
+    scale = min(size / w, size / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+    return scale, new_w, new_h, (size - new_w) // 2, (size - new_h) // 2
+
+
+def letterbox_into(image: np.ndarray, out: np.ndarray, resized: np.ndarray = None,
+                   fill_margins: bool = True):
+    """
+    letterbox + BGR->RGB + 归一化，直接写入 NCHW 中的一张 out (3,S,S float32)
+
+    只转换缩放后的有效区域；灰边在 fill_margins 为 False 时沿用 out 中已有的值
+    （同一几何参数下灰边不变）。resized 为复用的缩放缓冲，尺寸不符时临时分配。
+
+    Returns:
+        (scale, (pad_w, pad_h))
+    """
+    h, w = image.shape[:2]
+    scale, new_w, new_h, pad_w, pad_h = letterbox_geometry(w, h, out.shape[1])
+
+    if fill_margins:
+        out[:, :pad_h] = _PAD_VALUE
+        out[:, pad_h+new_h:] = _PAD_VALUE
+        out[:, :, :pad_w] = _PAD_VALUE
+        out[:, :, pad_w+new_w:] = _PAD_VALUE
+
+    if resized is None or resized.shape[:2] != (new_h, new_w):
+        resized = None
+    resized = cv2.resize(image, (new_w, new_h), dst=resized)
+
+    # 一次完成 BGR->RGB、HWC->CHW 和归一化
+    roi = out[:, pad_h:pad_h+new_h, pad_w:pad_w+new_w]
+    np.multiply(resized[..., ::-1], _INV_255, out=roi.transpose(1, 2, 0))
+
+    return scale, (pad_w, pad_h)
+
 
 class YOLODetector:
-    """YOLOv8 Nano 人物检测器 (OpenCV DNN版)"""
+    """YOLOv8 Nano 人物检测器 (OpenCV DNN / ONNX Runtime)"""
 
     PERSON_CLASS_ID = 0
     MODEL_NAME = "yolov8n.onnx"
+    # quantize_model.py 生成的 INT8 模型，仅 ORT 后端使用 (OpenCV DNN 没有 INT8 推理路径)
+    INT8_MODEL_NAME = "yolov8n_int8.onnx"
+    # quantize_model.py --fp16 生成的 FP16 模型 (输入输出仍为 FP32)，仅 CUDA FP16 目标使用
+    FP16_MODEL_NAME = "yolov8n_fp16.onnx"
 
     def __init__(self, model_path: str = None, conf_threshold: float = 0.5,
-                 input_size: int = 640):
+                 input_size: int = 640, backend: str = "auto"):
         """
         初始化检测器
 
         Args:
             model_path: ONNX模型路径
             conf_threshold: 置信度阈值
-            input_size: 输入图像大小
+            input_size: 输入图像大小 (模型为固定尺寸导出时以模型为准)
+            backend: "opencv" / "ort" / "auto" (装了 onnxruntime 就用 ORT)
+                     OpenCV DNN 下自动选用 CUDA / OpenVINO，不可用时用自带 CPU 实现
         """
         self.conf_threshold = conf_threshold
         self.input_size = input_size
 
-        # 确定模型路径
+        if backend == "auto":
+            backend = "ort" if ort is not None else "opencv"
+        if backend == "ort" and ort is None:
+            raise ImportError("未安装 onnxruntime，请 pip install onnxruntime 或使用 backend='opencv'")
+        self.backend = backend
+
+        # 确定模型路径: ORT 后端优先使用 INT8 模型；DNN 选中 FP16 目标时再换用 FP16 模型
+        self._fp16_model_path = None
         if model_path is None:
             model_dir = Path(__file__).parent / "models"
             model_path = model_dir / self.MODEL_NAME
+            if backend == "ort" and (model_dir / self.INT8_MODEL_NAME).exists():
+                model_path = model_dir / self.INT8_MODEL_NAME
+            if (model_dir / self.FP16_MODEL_NAME).exists():
+                self._fp16_model_path = model_dir / self.FP16_MODEL_NAME
 
         if not Path(model_path).exists():
             raise FileNotFoundError(
@@ -38,15 +121,90 @@ class YOLODetector:
                 f"下载地址: https://github.com/ultralytics/assets/releases"
             )
 
-        # 使用OpenCV DNN加载模型
-        print(f"正在加载模型: {model_path}")
-        self.net = cv2.dnn.readNetFromONNX(str(model_path))
+        print(f"正在加载模型: {model_path} ({backend})")
+        if backend == "ort":
+            self._load_ort(model_path)
+        else:
+            # 使用OpenCV DNN加载模型
+            self.net = cv2.dnn.readNetFromONNX(str(model_path))
+        input_size = self.input_size
+
+        # 模型导出为固定 batch=1 时无法批量推理，第一次失败后 detect_batch 改为逐帧
+        self._batch_supported = True
+
+        # 预处理缓冲复用：缩放后的图像和 NCHW 输入（batch 变大时扩容）
+        # _blob_geom 记录每张输入上次写入的几何参数，相同时不重填灰边
+        self._resized_u8 = None
+        self._blob = np.empty((1, 3, input_size, input_size), dtype=np.float32)
+        self._blob_geom = [None]
+        # numba 后处理的候选输出和 NMS 保留行号缓冲 (按模型输出的候选数分配)
+        self._post_buf = None
+        self._keep_buf = None
+
+        if backend == "opencv":
+            self._select_dnn_target()
+
+        print("YOLO检测器初始化完成")
+
+    def _select_dnn_target(self):
+        """按 DNN_TARGETS 顺序选择可用的 DNN 后端，用一次空白推理确认能跑通，都不行时用 OpenCV CPU"""
+        self._blob[:1].fill(0)
+        for name, backend_id, target_id, half in DNN_TARGETS:
+            if target_id not in cv2.dnn.getAvailableTargets(backend_id):
+                continue
+            if backend_id == cv2.dnn.DNN_BACKEND_CUDA and cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                continue
+            self.net.setPreferableBackend(backend_id)
+            self.net.setPreferableTarget(target_id)
+            try:
+                self._infer(self._blob[:1])
+            except cv2.error:
+                continue
+            print(f"DNN 后端: {name}")
+            if half and self._fp16_model_path is not None:
+                self._load_fp16_net(backend_id, target_id)
+            return
 
-        # 设置CPU后端
         self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
         self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
 
-        print("YOLO检测器初始化完成")
+    def _load_fp16_net(self, backend_id, target_id):
+        """换用 FP16 模型（权重减半），加载或推理失败时保留当前 FP32 模型"""
+        net = self.net
+        try:
+            self.net = cv2.dnn.readNetFromONNX(str(self._fp16_model_path))
+            self.net.setPreferableBackend(backend_id)
+            self.net.setPreferableTarget(target_id)
+            self._infer(self._blob[:1])
+        except cv2.error:
+            self.net = net
+            return
+        print(f"使用FP16模型: {self._fp16_model_path}")
+
+    def _load_ort(self, model_path):
+        """创建 ORT 推理会话（装了 onnxruntime-gpu 时优先 CUDA）；模型输入为固定尺寸时以模型尺寸为准"""
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        available = ort.get_available_providers()
+        providers = [p for p in ORT_PROVIDERS if p in available]
+        self.session = ort.InferenceSession(str(model_path), sess_options=options,
+                                            providers=providers)
+        print(f"ORT 执行后端: {self.session.get_providers()[0]}")
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+
+        # 输入形状 [N, 3, H, W]，动态维度是字符串
+        height = model_input.shape[2]
+        if isinstance(height, int) and height != self.input_size:
+            print(f"模型输入固定为 {height}，忽略 input_size={self.input_size}")
+            self.input_size = height
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        """对 NCHW blob 做一次前向，返回 [B, 84, N] 输出"""
+        if self.backend == "ort":
+            return self.session.run(None, {self._input_name: blob})[0]
+        self.net.setInput(blob)
+        return self.net.forward()
 
     def detect(self, image: np.ndarray) -> list:
         """
@@ -61,63 +219,93 @@ class YOLODetector:
         h, w = image.shape[:2]
 
         # 预处理: letterbox + 归一化
-        blob, scale, pad = self._preprocess(image)
+        scale, pad = self._preprocess(image)
 
         # 推理
-        self.net.setInput(blob)
-        outputs = self.net.forward()
+        outputs = self._infer(self._blob[:1])
 
         # 后处理
         detections = self._postprocess(outputs, scale, pad, w, h)
 
         return detections
 
-    def _preprocess(self, image: np.ndarray):
-        """预处理图像"""
-        h, w = image.shape[:2]
-        size = self.input_size
+    def detect_batch(self, images: list) -> list:
+        """
+        批量检测多张图像，一次 forward 完成推理
 
-        # 计算缩放比例 (保持宽高比)
-        scale = min(size / w, size / h)
-        new_w, new_h = int(w * scale), int(h * scale)
+        Args:
+            images: BGR格式的OpenCV图像列表
 
-        # 缩放
-        resized = cv2.resize(image, (new_w, new_h))
+        Returns:
+            每张图像的检测结果列表，格式同 detect
+        """
+        if len(images) <= 1 or not self._batch_supported:
+            return [self.detect(image) for image in images]
+
+        batch = len(images)
+        self._ensure_blob(batch)
+        letterboxed = [self._preprocess(image, i) for i, image in enumerate(images)]
+
+        try:
+            outputs = self._infer(self._blob[:batch])
+        except Exception:  # cv2.error 或 ORT 的形状错误 (各自的异常类型不同)
+            outputs = None
+        if outputs is None or outputs.shape[0] != len(images):
+            self._batch_supported = False
+            return [self.detect(image) for image in images]
+
+        # 输出 [B, 84, 8400]，按图像拆开分别后处理
+        results = []
+        for i, (image, (scale, pad)) in enumerate(zip(images, letterboxed)):
+            h, w = image.shape[:2]
+            results.append(self._postprocess(outputs[i:i+1], scale, pad, w, h))
+        return results
 
-        # 创建letterbox
-        pad_w = (size - new_w) // 2
-        pad_h = (size - new_h) // 2
-        padded = np.full((size, size, 3), 114, dtype=np.uint8)
-        padded[pad_h:pad_h+new_h, pad_w:pad_w+new_w] = resized
+    def _ensure_blob(self, batch: int):
+        """保证 NCHW 输入缓冲至少容纳 batch 张图像"""
+        if self._blob.shape[0] < batch:
+            size = self.input_size
+            self._blob = np.empty((batch, 3, size, size), dtype=np.float32)
+            self._blob_geom = [None] * batch
 
-        # 转换为blob: BGR->RGB, HWC->NCHW, 归一化
-        blob = cv2.dnn.blobFromImage(padded, 1/255.0, (size, size), swapRB=True, crop=False)
+    def _preprocess(self, image: np.ndarray, idx: int = 0):
+        """
+        预处理图像: letterbox + BGR->RGB + HWC->NCHW + 归一化，直接写入 self._blob[idx]
 
-        return blob, scale, (pad_w, pad_h)
+        Returns:
+            (scale, (pad_w, pad_h))
+        """
+        h, w = image.shape[:2]
+        geom = letterbox_geometry(w, h, self.input_size)
+        new_w, new_h = geom[1], geom[2]
+        if self._resized_u8 is None or self._resized_u8.shape[:2] != (new_h, new_w):
+            self._resized_u8 = np.empty((new_h, new_w, 3), dtype=np.uint8)
+
+        fill = self._blob_geom[idx] != geom
+        self._blob_geom[idx] = geom
+        return letterbox_into(image, self._blob[idx], self._resized_u8, fill)
 
     def _postprocess(self, outputs: np.ndarray, scale: float, pad: tuple,
                      orig_w: int, orig_h: int) -> list:
         """后处理检测结果"""
-        # YOLOv8输出: [1, 84, 8400] -> 转置为 [8400, 84]
-        outputs = outputs[0].T
+        if postprocess_jit is not None:
+            return self._postprocess_jit(outputs[0], scale, pad, orig_w, orig_h)
 
-        # 提取边界框和人物类别置信度
-        boxes = outputs[:, :4]  # cx, cy, w, h (归一化坐标 0-1)
-        scores = outputs[:, 4 + self.PERSON_CLASS_ID]
+        # YOLOv8输出: [1, 84, 8400]，按原布局取行，不转置
+        preds = outputs[0]
 
-        # 过滤低置信度
+        # 先用人物类别置信度过滤，再只取通过的候选框 (cx, cy, w, h 归一化坐标 0-1)
+        scores = preds[4 + self.PERSON_CLASS_ID]
         mask = scores > self.conf_threshold
-        boxes = boxes[mask]
-        scores = scores[mask]
-
-        if len(boxes) == 0:
+        if not mask.any():
             return []
+        scores = scores[mask]
 
-        # 归一化坐标转像素坐标 (乘以input_size)
-        boxes = boxes * self.input_size
+        # 归一化坐标转像素坐标 (乘以input_size)，得到 [4, M]
+        boxes = preds[:4, mask] * self.input_size
 
         # 转换坐标: cx,cy,w,h -> x1,y1,x2,y2
-        cx, cy, bw, bh = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        cx, cy, bw, bh = boxes
         x1 = cx - bw / 2
         y1 = cy - bh / 2
         x2 = cx + bw / 2
@@ -136,17 +324,34 @@ class YOLODetector:
         x2 = np.clip(x2, 0, orig_w)
         y2 = np.clip(y2, 0, orig_h)
 
-        # NMS
-        boxes_for_nms = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).tolist()
-        indices = cv2.dnn.NMSBoxes(boxes_for_nms, scores.tolist(), self.conf_threshold, 0.45)
+        return self._nms(x1, y1, x2, y2, scores)
 
-        results = []
-        for i in indices:
-            idx = i[0] if isinstance(i, (list, np.ndarray)) else i
-            results.append((int(x1[idx]), int(y1[idx]), int(x2[idx]), int(y2[idx]), float(scores[idx])))
+    def _postprocess_jit(self, preds: np.ndarray, scale: float, pad: tuple,
+                         orig_w: int, orig_h: int) -> list:
+        """numba 版后处理: 一次扫描 8400 个候选，只写出通过阈值的行，NMS 也在核函数内完成"""
+        if self._post_buf is None or self._post_buf.shape[0] < preds.shape[1]:
+            self._post_buf = np.empty((preds.shape[1], 5), dtype=np.float32)
+            self._keep_buf = np.empty(preds.shape[1], dtype=np.intp)
+        pad_w, pad_h = pad
+        n = postprocess_jit(preds, 4 + self.PERSON_CLASS_ID, self.conf_threshold, self.input_size,
+                            scale, pad_w, pad_h, orig_w, orig_h, self._post_buf)
+        if n == 0:
+            return []
+        k = nms_jit(self._post_buf, n, NMS_IOU_THRESHOLD, self._keep_buf)
+        kept = self._post_buf[self._keep_buf[:k]]
+        boxes = kept[:, :4].astype(np.int32).tolist()
+        return [(bx1, by1, bx2, by2, conf) for (bx1, by1, bx2, by2), conf in zip(boxes, kept[:, 4].tolist())]
+
+    def _nms(self, x1, y1, x2, y2, scores) -> list:
+        """NMS 并转换为 [(x1, y1, x2, y2, confidence), ...]，按置信度降序"""
+        # NMSBoxes 以 Python 列表传入最快（数组参数要逐元素转换 Rect2d，反而更慢）
+        boxes_for_nms = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).tolist()
+        indices = cv2.dnn.NMSBoxes(boxes_for_nms, scores.tolist(), self.conf_threshold, NMS_IOU_THRESHOLD)
+        # 旧版 OpenCV 返回 (K,1)，新版返回 (K,)；结果已按置信度降序
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1)
 
-        results.sort(key=lambda x: x[4], reverse=True)
-        return results
+        # 保留的框通常只有几个，逐个转换比整体 stack/astype 更省
+        return [(int(x1[i]), int(y1[i]), int(x2[i]), int(y2[i]), float(scores[i])) for i in indices.tolist()]
 
     def detect_largest_person(self, image: np.ndarray) -> tuple:
         """检测面积最大的人物"""